@@ -0,0 +1,30 @@
+from typing import Any, List
+
+# Submodules are imported lazily on first access, so that importing pyshell2 does not
+# import asyncio and friends unless they are needed.
+__all__ = [
+    "asyncdocker",
+    "asyncshell",
+    "core",
+    "docker",
+    "dockerplan",
+    "env",
+    "outputlog",
+    "parsers",
+    "recording",
+    "results",
+    "shell",
+    "singleflight",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name in __all__:
+        import importlib
+
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    return sorted([*globals(), *__all__])
@@ -1,6 +1,36 @@
+from __future__ import annotations
+
+import asyncio
+import io
+import json
 import os
-from pathlib import Path
-from typing import Dict, List, Optional, Union
+import re
+import tarfile
+import tempfile
+import time
+from datetime import datetime
+from functools import partial
+from logging import DEBUG
+from pathlib import Path, PurePosixPath
+from stat import S_IMODE, S_ISDIR, S_ISLNK, S_ISREG
+from types import TracebackType
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from pyshell2.asyncshell import (
     DEFAULT_CHECK_EXITCODE,
@@ -8,11 +38,110 @@ from pyshell2.asyncshell import (
     DEFAULT_STDOUT_LOG_LEVEL,
     ProcessInfo,
     sh,
+    sh_lines,
 )
+from pyshell2.core import quote_arg
+from pyshell2.dockerplan import DockerRunPlan
+from pyshell2.results import ResultSet
+from pyshell2.singleflight import DEFAULT_SINGLE_FLIGHT, SingleFlight
 
 # Constants
-DOCKER_USER_ME = f"{os.getuid()}:{os.getgid()}"
 DOCKER_USER_ROOT = "0:0"
+CACHE_LABEL = "pyshell2.cache"  # Label of the volumes created by ensure_cache
+
+T = TypeVar("T")
+
+# Names of the caches ensured by this process
+_caches: Set[str] = set()
+
+# A build context is either a directory or a mapping of file names to file contents
+BuildContext = Union[Path, Mapping[str, bytes]]
+
+
+def __getattr__(name: str) -> str:
+    # Constants looked up lazily, as they require system calls
+    if name == "DOCKER_USER_ME":
+        value = globals()[name] = f"{os.getuid()}:{os.getgid()}"
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class Container:
+    """Handle of a docker container.
+
+    The container is removed when leaving the async context of the handle, whether or
+    not it has exited.
+    """
+
+    def __init__(self, id: str) -> None:
+        self.id = id
+
+    def __repr__(self) -> str:
+        return f"Container({self.id!r})"
+
+    async def __aenter__(self) -> "Container":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.remove()
+
+    async def logs(
+        self,
+        follow: bool = True,
+        log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    ) -> AsyncIterator[str]:
+        """Yields the lines of the container's stdout and stderr as they are written.
+
+        Args:
+            follow: Whether to keep following the logs until the container exits.
+            log_level: Log level of the lines.
+        """
+        args = ["docker", "logs", f"--follow={str(follow).lower()}", self.id, "2>&1"]
+        async for line in sh_lines(args, stdout_log_level=log_level):
+            yield line
+
+    async def stats(self, log_level: int = DEBUG) -> AsyncIterator[Dict[str, Any]]:
+        """Yields resource usage statistics of the container as they are sampled.
+
+        Args:
+            log_level: Log level of the raw statistics.
+        """
+        args = ["docker", "stats", "--format", "{{json .}}", self.id]
+        async for line in sh_lines(args, stdout_log_level=log_level):
+            if (start := line.find("{")) != -1:  # Skip terminal control sequences
+                yield json.loads(line[start:])
+
+    async def wait(self) -> int:
+        """Waits for the container to exit and returns its exit code."""
+        process_info = await sh(["docker", "wait", self.id], stdout_log_level=DEBUG)
+        return int(process_info.stdout)
+
+    async def stop(self, timeout: Optional[int] = None) -> None:
+        """Stops the container, killing it if it has not exited after the timeout."""
+        args = ["docker", "stop"]
+        if timeout is not None:
+            args += ["--time", str(timeout)]
+        await sh([*args, self.id], stdout_log_level=DEBUG)
+
+    async def kill(self, signal: Optional[str] = None) -> None:
+        """Sends a signal (SIGKILL by default) to the container."""
+        args = ["docker", "kill"]
+        if signal is not None:
+            args += ["--signal", signal]
+        await sh([*args, self.id], stdout_log_level=DEBUG)
+
+    async def remove(self) -> None:
+        """Forcibly removes the container, killing it if it is still running."""
+        await sh(
+            ["docker", "rm", "--force", self.id],
+            stdout_log_level=DEBUG,
+            check_exitcode=False,
+        )
 
 
 async def docker_sh(
@@ -24,12 +153,22 @@ async def docker_sh(
     stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
     stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
     check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    env: Optional[Mapping[str, str]] = None,
+    env_file: Optional[Path] = None,
+    workdir: Optional[str] = None,
+    transfer: bool = False,
+    outputs: Optional[List[Path]] = None,
+    tmpfs: Optional[List[str]] = None,
+    caches: Optional[Mapping[str, str]] = None,
+    single_flight: Union[bool, SingleFlight] = False,
 ) -> ProcessInfo:
     """Runs a shell command inside a docker image.
 
     This is a easier to use version of docker_run with some automagic features. The
     current automagic features include:
     - Automatic mounting of files and directories in the command args.
+    - Alternatively, automatic copying of files and directories in the command args
+      into the container, and of outputs back out of it.
 
     The benefit of using this function is cleaner code and you less to think about. The
     downside is less control. If you need full functionality use the parent function
@@ -48,11 +187,33 @@ async def docker_sh(
         stderr_log_level: Log level of the stderr of the shell command.
         check_exitcode: Whether to check if the exit code is zero or not. If true and
             exitcode is non-zero, a CalledProcessError will be raised.
+        env: Environment variables to set in the container. See "--env" arg for docker
+            run for more info.
+        env_file: File of environment variables to set in the container. See
+            "--env-file" arg for docker run for more info.
+        workdir: Working directory of the command inside the container. See "--workdir"
+            arg for docker run for more info.
+        transfer: Whether to copy the paths in the command args into the container,
+            streamed as a tar archive over the stdin of "docker cp", instead of
+            mounting them. Unlike mounts, this works with remote docker daemons.
+        outputs: Paths in the command args written by the command. If transfer is
+            true, they are copied back out of the container once the command exited
+            with a zero exitcode. Otherwise they are written through their mounts.
+        tmpfs: Paths inside the container to mount a tmpfs on, for scratch data which
+            would otherwise be written to the slow writable layer of the container. See
+            "--tmpfs" arg for docker run for more info.
+        caches: Named volumes to mount, mapped to their path inside the container,
+            e.g. to reuse a package cache across runs. The volumes are created by
+            ensure_cache on first use and can be removed with prune_caches.
+        single_flight: Whether to collapse the call with an identical call which is
+            already running, see sh. Calls are identical if their docker commands,
+            including the image, mounts and env, and their files and outputs are.
     Returns:
         A ProcessInfo containing the exitcode, stdout, and stderr from the command.
     Raises:
         CalledProcessError: If the shell command exited with a non-zero exitcode and
             check_exitcode is true.
+        ValueError: If an output is not in the command args.
     """
     files = dict.fromkeys([arg for arg in args if isinstance(arg, Path)])
 
@@ -60,6 +221,48 @@ async def docker_sh(
     for i, file in enumerate(files):
         volumes[file] = Path(f"/mnt/{i}/{file.name}")
 
+    for output in outputs or []:
+        if output not in volumes:
+            raise ValueError(f"Output {output} is not in the command args")
+
+    if transfer:
+        plan = DockerRunPlan.create(
+            image=image,
+            args=[
+                volumes[arg].as_posix() if isinstance(arg, Path) else arg
+                for arg in args
+            ],
+            cleanup=False,
+            user=user,
+            entrypoint=entrypoint,
+            network=network,
+            env=env,
+            env_file=env_file,
+            workdir=workdir,
+            tmpfs=tmpfs,
+            caches=caches,
+        )
+        transfer_files = partial(
+            _docker_transfer,
+            plan=plan,
+            files=volumes,
+            outputs=outputs or [],
+            stdout_log_level=stdout_log_level,
+            stderr_log_level=stderr_log_level,
+            check_exitcode=check_exitcode,
+        )
+        if not single_flight:
+            return await transfer_files()
+
+        key = (
+            plan,
+            tuple((src.resolve(), dst) for src, dst in volumes.items()),
+            tuple(output.resolve() for output in outputs or []),
+            check_exitcode,
+        )
+        group = DEFAULT_SINGLE_FLIGHT if single_flight is True else single_flight
+        return await group.run(key, transfer_files)
+
     return await docker_run(
         image=image,
         args=[
@@ -74,9 +277,59 @@ async def docker_sh(
         stdout_log_level=stdout_log_level,
         stderr_log_level=stderr_log_level,
         check_exitcode=check_exitcode,
+        env=env,
+        env_file=env_file,
+        workdir=workdir,
+        tmpfs=tmpfs,
+        caches=caches,
+        single_flight=single_flight,
     )
 
 
+async def _docker_transfer(
+    plan: DockerRunPlan,
+    files: Dict[Path, Path],
+    outputs: List[Path],
+    stdout_log_level: int,
+    stderr_log_level: int,
+    check_exitcode: bool,
+) -> ProcessInfo:
+    """Runs the plan in a new container, copying files in and outputs out of it."""
+    await _ensure_caches(plan.caches)
+    process_info = await sh(args=plan.create_argv, stdout_log_level=DEBUG)
+
+    async with Container(process_info.stdout.strip()) as container:
+        # The archive is generated while docker reads it
+        await sh(
+            args=["docker", "cp", "-", f"{container.id}:/"],
+            stdout_log_level=DEBUG,
+            input=_stream_archive(_file_entries(files)),
+        )
+        process_info = await sh(
+            args=["docker", "start", "--attach", container.id],
+            stdout_log_level=stdout_log_level,
+            stderr_log_level=stderr_log_level,
+            check_exitcode=check_exitcode,
+        )
+        if process_info.exitcode == 0:
+            await asyncio.gather(
+                *(
+                    sh(
+                        args=[
+                            "docker",
+                            "cp",
+                            f"{container.id}:{files[output].as_posix()}",
+                            _mkdir(output.resolve().parent).as_posix(),
+                        ],
+                        stdout_log_level=DEBUG,
+                    )
+                    for output in outputs
+                )
+            )
+
+    return process_info
+
+
 async def docker_run(
     image: str,
     args: List[str],
@@ -89,38 +342,481 @@ async def docker_run(
     stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
     stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
     check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    env: Optional[Mapping[str, str]] = None,
+    env_file: Optional[Path] = None,
+    workdir: Optional[str] = None,
+    tmpfs: Optional[List[str]] = None,
+    caches: Optional[Mapping[str, str]] = None,
+    single_flight: Union[bool, SingleFlight] = False,
 ) -> ProcessInfo:
     """Runs a docker run command."""
-    cmd = [
-        "docker",
-        "run",
-        f"-d={str(detached).lower()}",
-        f"--rm={str(cleanup).lower()}",
-    ]
-
-    if user is not None:
-        cmd += ["--user", user]
-
-    if entrypoint is not None:
-        cmd += ["--entrypoint", entrypoint]
-
-    if volumes is not None:
-        for src, dst in volumes.items():
-            escaped_quote = '\\"'
-            mount = [
-                "type=bind",
-                f"{escaped_quote}src={src.resolve()}{escaped_quote}",
-                f"{escaped_quote}dst={dst.resolve()}{escaped_quote}",
-            ]
-            cmd += ["--mount", ",".join(mount)]
-
-    if network is not None:
-        cmd += ["--network", network]
-
-    cmd += [image, *args]
+    plan = DockerRunPlan.create(
+        image=image,
+        args=args,
+        detached=detached,
+        cleanup=cleanup,
+        user=user,
+        entrypoint=entrypoint,
+        volumes=volumes,
+        network=network,
+        env=env,
+        env_file=env_file,
+        workdir=workdir,
+        tmpfs=tmpfs,
+        caches=caches,
+    )
+    await _ensure_caches(plan.caches)
     return await sh(
-        args=cmd,
+        args=plan.argv,
         stdout_log_level=stdout_log_level,
         stderr_log_level=stderr_log_level,
         check_exitcode=check_exitcode,
+        single_flight=single_flight,
+    )
+
+
+async def docker_start(
+    image: str,
+    args: List[str],
+    cleanup: bool = False,
+    user: Optional[str] = None,
+    entrypoint: Optional[str] = None,
+    volumes: Optional[Dict[Path, Path]] = None,
+    network: Optional[str] = None,
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+    env: Optional[Mapping[str, str]] = None,
+    env_file: Optional[Path] = None,
+    workdir: Optional[str] = None,
+    tmpfs: Optional[List[str]] = None,
+    caches: Optional[Mapping[str, str]] = None,
+) -> Container:
+    """Runs a detached docker container and returns a handle of it.
+
+    See docker_run for the arguments. Note that cleanup defaults to false, as the
+    container is removed by the handle and removing it as soon as it exits would make
+    its logs and exit code unavailable.
+    """
+    process_info = await docker_run(
+        image=image,
+        args=args,
+        detached=True,
+        cleanup=cleanup,
+        user=user,
+        entrypoint=entrypoint,
+        volumes=volumes,
+        network=network,
+        stdout_log_level=stdout_log_level,
+        stderr_log_level=stderr_log_level,
+        check_exitcode=True,
+        env=env,
+        env_file=env_file,
+        workdir=workdir,
+        tmpfs=tmpfs,
+        caches=caches,
+    )
+    return Container(process_info.stdout.strip())
+
+
+async def docker_run_plans(
+    plans: Iterable[DockerRunPlan],
+    max_concurrency: Optional[int] = None,
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+    check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    as_result_set: bool = False,
+) -> Union[List[ProcessInfo], ResultSet]:
+    """Runs the docker run commands of plans concurrently.
+
+    Args:
+        plans: Plans of the docker run commands to run.
+        max_concurrency: Maximum number of commands running at once. If None, all
+            commands are run at once.
+        stdout_log_level: Log level of the stdout of the shell commands.
+        stderr_log_level: Log level of the stderr of the shell commands.
+        check_exitcode: Whether to check if the exit codes are zero or not. If true and
+            any exitcode is non-zero, a CalledProcessError will be raised.
+        as_result_set: Whether to return the results as a ResultSet, which stores
+            them far more compactly than a list of ProcessInfos.
+    Returns:
+        A ProcessInfo of every plan, in the order of the plans, as a list or as a
+        ResultSet if as_result_set is true.
+    Raises:
+        CalledProcessError: If any shell command exited with a non-zero exitcode and
+            check_exitcode is true.
+    """
+    plans = list(plans)
+    await _ensure_caches(cache for plan in plans for cache in plan.caches)
+    process_infos = await _gather_bounded(
+        [
+            sh(
+                args=plan.argv,
+                stdout_log_level=stdout_log_level,
+                stderr_log_level=stderr_log_level,
+                check_exitcode=check_exitcode,
+            )
+            for plan in plans
+        ],
+        max_concurrency,
+    )
+    return ResultSet(process_infos) if as_result_set else process_infos
+
+
+class DockerBuild(NamedTuple):
+    """Build of a docker image. See docker_build for more info."""
+
+    context: BuildContext
+    dockerfile: Optional[str] = None
+    build_args: Optional[Mapping[str, str]] = None
+
+
+async def docker_build(
+    context: BuildContext,
+    tag: Optional[str] = None,
+    dockerfile: Optional[str] = None,
+    build_args: Optional[Mapping[str, str]] = None,
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+) -> str:
+    """Builds a docker image.
+
+    The build context is archived on the fly and streamed to docker build through stdin,
+    one file at a time, so it is never staged on disk.
+
+    Args:
+        context: Build context, either a directory or a mapping of file names (relative
+            to the root of the context) to file contents.
+        tag: Name and optionally a tag of the image. See "--tag" arg for docker build
+            for more info.
+        dockerfile: Name of the Dockerfile within the context. See "--file" arg for
+            docker build for more info.
+        build_args: Build-time variables. See "--build-arg" arg for docker build for
+            more info.
+        stdout_log_level: Log level of the stdout of the build.
+        stderr_log_level: Log level of the stderr of the build. Note that docker writes
+            the build progress to stderr.
+    Returns:
+        The ID of the image, usable to run exactly this image even if the tag is moved.
+    Raises:
+        CalledProcessError: If the build failed.
+    """
+    with tempfile.TemporaryDirectory() as tmpdir:
+        iidfile = Path(tmpdir, "iid")
+
+        cmd = ["docker", "build", "--iidfile", str(iidfile)]
+
+        if tag is not None:
+            cmd += ["--tag", tag]
+
+        if dockerfile is not None:
+            cmd += ["--file", dockerfile]
+
+        for key, value in (build_args or {}).items():
+            cmd += ["--build-arg", quote_arg(f"{key}={value}")]
+
+        await sh(
+            args=[*cmd, "-"],
+            stdout_log_level=stdout_log_level,
+            stderr_log_level=stderr_log_level,
+            check_exitcode=True,
+            input=_stream_archive(_context_entries(context)),
+        )
+
+        return iidfile.read_text().strip()
+
+
+async def docker_build_all(
+    builds: Mapping[str, DockerBuild],
+    max_concurrency: Optional[int] = None,
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+) -> Dict[str, str]:
+    """Builds docker images concurrently.
+
+    See docker_build for more info.
+
+    Args:
+        builds: Build of every image, by the tag of the image.
+        max_concurrency: Maximum number of builds running at once. If None, all images
+            are built at once.
+        stdout_log_level: Log level of the stdout of the builds.
+        stderr_log_level: Log level of the stderr of the builds. Note that docker writes
+            the build progress to stderr.
+    Returns:
+        The ID of every image, by the tag of the image.
+    Raises:
+        CalledProcessError: If any build failed.
+    """
+    image_ids = await _gather_bounded(
+        [
+            docker_build(
+                context=build.context,
+                tag=tag,
+                dockerfile=build.dockerfile,
+                build_args=build.build_args,
+                stdout_log_level=stdout_log_level,
+                stderr_log_level=stderr_log_level,
+            )
+            for tag, build in builds.items()
+        ],
+        max_concurrency,
+    )
+    return dict(zip(builds, image_ids))
+
+
+async def ensure_cache(name: str) -> str:
+    """Creates a named volume to use as a cache, unless it already exists.
+
+    The volume is labelled as a cache, so that it is pruned by prune_caches. Only the
+    first call per name and process runs docker.
+
+    Args:
+        name: Name of the volume.
+    Returns:
+        The name of the volume.
+    """
+    if name not in _caches:
+        await sh(
+            ["docker", "volume", "create", "--label", CACHE_LABEL, name],
+            stdout_log_level=DEBUG,
+        )
+        _caches.add(name)
+    return name
+
+
+async def prune_caches(
+    max_age: Optional[float] = None,
+    max_size: Optional[int] = None,
+) -> List[str]:
+    """Removes the volumes created by ensure_cache which are too old or too large.
+
+    Caches in use by a container are never removed.
+
+    Args:
+        max_age: Maximum age of a cache since it was created, in seconds. If None,
+            caches are not removed by age.
+        max_size: Maximum total size of the caches, in bytes. The oldest caches are
+            removed until the caches fit. If None, caches are not removed by size.
+    Returns:
+        The names of the removed caches.
+    """
+    process_info = await sh(
+        ["docker", "volume", "ls", "--quiet", "--filter", f"label={CACHE_LABEL}"],
+        stdout_log_level=DEBUG,
+    )
+    names = process_info.stdout.split()
+    if not names:
+        return []
+
+    process_info = await sh(
+        ["docker", "volume", "inspect", *names], stdout_log_level=DEBUG
+    )
+    created = {
+        volume["Name"]: _parse_timestamp(volume["CreatedAt"])
+        for volume in json.loads(process_info.stdout)
+    }
+    names.sort(key=created.__getitem__)  # Oldest first
+
+    removed: List[str] = []
+    in_use: Set[str] = set()
+
+    async def remove(name: str) -> None:
+        process_info = await sh(
+            ["docker", "volume", "rm", name],
+            stdout_log_level=DEBUG,
+            stderr_log_level=DEBUG,  # Fails if the cache is in use
+            check_exitcode=False,
+        )
+        if process_info.exitcode == 0:
+            removed.append(name)
+            _caches.discard(name)
+        else:
+            in_use.add(name)
+
+    now = time.time()
+    for name in names:
+        if max_age is not None and now - created[name] > max_age:
+            await remove(name)
+
+    if max_size is not None:
+        sizes = await _volume_sizes()
+        size = sum(sizes.get(name, 0) for name in names if name not in removed)
+        for name in names:
+            if size <= max_size:
+                break
+            # Caches in use are kept, so they still count towards the size
+            if name not in removed and name not in in_use:
+                await remove(name)
+                if name in removed:
+                    size -= sizes.get(name, 0)
+
+    return removed
+
+
+async def _ensure_caches(caches: Iterable[Tuple[str, str]]) -> None:
+    await asyncio.gather(*map(ensure_cache, dict(caches)))
+
+
+async def _volume_sizes() -> Dict[str, int]:
+    process_info = await sh(
+        ["docker", "system", "df", "--verbose", "--format", "{{json .Volumes}}"],
+        stdout_log_level=DEBUG,
     )
+    return {
+        volume["Name"]: _parse_size(volume["Size"])
+        for volume in json.loads(process_info.stdout) or []
+    }
+
+
+def _parse_timestamp(timestamp: str) -> float:
+    # E.g. "2024-01-02T03:04:05Z", with fractional seconds fromisoformat cannot parse
+    timestamp = re.sub(r"\.\d+", "", timestamp).replace("Z", "+00:00")
+    return datetime.fromisoformat(timestamp).timestamp()
+
+
+def _parse_size(size: str) -> int:
+    # Docker formats sizes with decimal units, e.g. "1.5MB"
+    match = re.fullmatch(r"([\d.]+)\s*([kMGTP]?)B", size.strip())
+    if match is None:
+        return 0
+    number, unit = match.groups()
+    return int(float(number) * 1000 ** " kMGTP".index(unit or " "))
+
+
+# Size of the chunks in which files are read into archives
+_CHUNK_SIZE = 2**16
+
+# Entry of an archive, with the file or data of its contents if it is a regular file
+_ArchiveEntry = Tuple[tarfile.TarInfo, Optional[Union[Path, bytes]]]
+
+
+def _tarinfo(path: Path, arcname: str) -> Optional[tarfile.TarInfo]:
+    """Returns the header of path like TarFile.gettarinfo, or None if it is neither a
+    regular file, a directory nor a symbolic link."""
+    stat = path.lstat()
+    info = tarfile.TarInfo(arcname)
+    info.mode = S_IMODE(stat.st_mode)
+    info.uid, info.gid = stat.st_uid, stat.st_gid
+    info.mtime = stat.st_mtime
+
+    if S_ISREG(stat.st_mode):
+        info.size = stat.st_size
+    elif S_ISDIR(stat.st_mode):
+        info.type = tarfile.DIRTYPE
+    elif S_ISLNK(stat.st_mode):
+        info.type = tarfile.SYMTYPE
+        info.linkname = os.readlink(path)
+    else:
+        return None
+    return info
+
+
+def _tree_entries(path: Path, arcname: str) -> Iterator[_ArchiveEntry]:
+    """Yields the entries of path and, if it is a directory, of everything below it."""
+    for subpath in [path, *(sorted(path.rglob("*")) if path.is_dir() else [])]:
+        name = PurePosixPath(arcname, subpath.relative_to(path).as_posix())
+        info = _tarinfo(subpath, name.as_posix())
+        if info is not None:
+            yield info, subpath
+
+
+def _context_entries(context: BuildContext) -> Iterator[_ArchiveEntry]:
+    if isinstance(context, Path):
+        yield from _tree_entries(context, ".")
+    else:
+        for name, data in context.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            yield info, data
+
+
+def _file_entries(files: Dict[Path, Path]) -> Iterator[_ArchiveEntry]:
+    for src, dst in files.items():
+        # Writable by any user, so that outputs can be created in it
+        info = tarfile.TarInfo(dst.parent.as_posix().lstrip("/"))
+        info.type = tarfile.DIRTYPE
+        info.mode = 0o777
+        yield info, None
+
+        if src.exists():
+            yield from _tree_entries(src, dst.as_posix().lstrip("/"))
+
+
+def _archive(entries: Iterable[_ArchiveEntry]) -> Iterator[bytes]:
+    """Generates a tar archive of entries, in chunks of at most _CHUNK_SIZE bytes for
+    the contents of files, which are thus never held whole in memory."""
+    size = 0
+
+    for info, contents in entries:
+        header = info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape")
+        yield header
+        size += len(header)
+
+        if not info.isreg() or info.size == 0 or contents is None:
+            continue
+
+        file = (
+            io.BytesIO(contents) if isinstance(contents, bytes) else contents.open("rb")
+        )
+        with file:
+            # Only the size in the header is read, in case the file grows meanwhile
+            remaining = info.size
+            while remaining:
+                chunk = file.read(min(remaining, _CHUNK_SIZE))
+                if not chunk:
+                    raise OSError(f"{info.name} shrank while it was archived")
+                yield chunk
+                remaining -= len(chunk)
+
+        padding = -info.size % tarfile.BLOCKSIZE
+        if padding:
+            yield tarfile.NUL * padding
+        size += info.size + padding
+
+    # Two empty blocks end the archive, which is padded to a whole record like tar does
+    end = 2 * tarfile.BLOCKSIZE
+    yield tarfile.NUL * (end + -(size + end) % tarfile.RECORDSIZE)
+
+
+async def _stream_archive(entries: Iterable[_ArchiveEntry]) -> AsyncIterator[bytes]:
+    """Streams the archive of entries, which is generated in the default executor so
+    that listing and reading the files does not block the event loop."""
+    loop = asyncio.get_running_loop()
+    chunks = _archive(entries)
+    while (chunk := await loop.run_in_executor(None, next, chunks, None)) is not None:
+        yield chunk
+
+
+def _mkdir(path: Path) -> Path:
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+async def _gather_bounded(
+    aws: List[Awaitable[T]],
+    max_concurrency: Optional[int],
+) -> List[T]:
+    """Awaits aws concurrently, at most max_concurrency at once.
+
+    If any awaitable raises, the others are cancelled, which kills their commands, and
+    awaited before the exception propagates.
+    """
+    semaphore = None if max_concurrency is None else asyncio.Semaphore(max_concurrency)
+
+    async def bounded(aw: Awaitable[T]) -> T:
+        if semaphore is None:
+            return await aw
+        async with semaphore:
+            return await aw
+
+    tasks = [asyncio.ensure_future(bounded(aw)) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for aw in aws:
+            if asyncio.iscoroutine(aw):
+                aw.close()  # Never awaited if cancelled while waiting for the semaphore
+        raise
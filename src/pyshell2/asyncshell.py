@@ -1,42 +1,491 @@
+from __future__ import annotations
+
 import asyncio
 import logging
-from asyncio import StreamReader, subprocess
+import os
+import signal
+import sys
+from asyncio import StreamReader, StreamWriter, subprocess
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import partial
+from os import PathLike
 from subprocess import CalledProcessError
-from typing import List, NamedTuple, Optional
-
-# Defaults
-DEFAULT_STDOUT_LOG_LEVEL = logging.INFO
-DEFAULT_STDERR_LOG_LEVEL = logging.ERROR
-DEFAULT_CHECK_EXITCODE = True
+from typing import (
+    Any,
+    AsyncGenerator,
+    AsyncIterable,
+    AsyncIterator,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
+from pyshell2.core import (
+    DEFAULT_CHECK_EXITCODE,
+    DEFAULT_RETAIN_OUTPUT,
+    DEFAULT_STDERR_LOG_LEVEL,
+    DEFAULT_STDOUT_LOG_LEVEL,
+    DEFAULT_STREAM_LIMIT,
+    OutputCallback,
+    ProcessInfo,
+    join_args,
+)
+from pyshell2.env import FrozenEnv, resolve_env
+from pyshell2.outputlog import STDERR, STDOUT, OutputLog
+from pyshell2.parsers import Parser
+from pyshell2.singleflight import DEFAULT_SINGLE_FLIGHT, SingleFlight
 
-class ProcessInfo(NamedTuple):
-    exitcode: int
-    stdout: str
-    stderr: str
+# Outputs at least this large are passed to worker processes through shared memory
+SHARED_MEMORY_SIZE = 2**20
 
 
-async def _read_stream(stream: Optional[StreamReader], loglevel: int) -> str:
+async def _read_stream(
+    stream: Optional[StreamReader],
+    loglevel: int,
+    parser: Optional[Parser] = None,
+    retain: bool = True,
+    output_log: Optional[OutputLog] = None,
+    fd: int = STDOUT,
+    callback: Optional[OutputCallback] = None,
+) -> str:
     lines: List[str] = []
 
     if stream is not None:
         while bdata := await stream.readline():
+            if output_log is not None:
+                output_log.append(fd, bdata)
+
             line = bdata.decode().rstrip("\n")  # Decode and remove trailing newline
 
-            lines.append(line)
+            if retain:
+                lines.append(line)
+            if parser is not None:
+                parser.feed(line)
             logging.log(loglevel, line)
+            if callback is not None:
+                await callback(line)
 
     return "\n".join(lines)
 
 
+async def _read_offloaded(
+    stream: Optional[StreamReader],
+    loglevel: int,
+    parser: Optional[Parser],
+    retain: bool,
+    output_log: Optional[OutputLog],
+    fd: int,
+    executor: Executor,
+) -> str:
+    data = bytearray()
+
+    if stream is not None:
+        while chunk := await stream.read(DEFAULT_STREAM_LIMIT):
+            if output_log is not None:
+                output_log.append(fd, chunk)
+            data += chunk
+
+    loop = asyncio.get_running_loop()
+    if isinstance(executor, ProcessPoolExecutor) and len(data) >= SHARED_MEMORY_SIZE:
+        from multiprocessing.shared_memory import SharedMemory
+
+        memory = SharedMemory(create=True, size=len(data))
+        try:
+            memory.buf[: len(data)] = data  # type: ignore[index]
+            records = await loop.run_in_executor(
+                executor,
+                _parse_shared,
+                memory.name,
+                len(data),
+                loglevel,
+                parser,
+                _resource_tracker_id(),
+            )
+        finally:
+            memory.close()
+            memory.unlink()
+    else:
+        records = await loop.run_in_executor(
+            executor, _parse_output, data, loglevel, parser
+        )
+
+    if parser is not None:
+        parser.add(records)
+
+    if not retain:
+        return ""
+    text = data.decode()
+    return text[:-1] if text.endswith("\n") else text  # Remove trailing newline
+
+
+def _parse_output(
+    data: Union[bytes, bytearray, memoryview],
+    loglevel: int,
+    parser: Optional[Parser],
+) -> List[Any]:
+    lines = str(data, "utf-8").split("\n")
+    if lines[-1] == "":
+        lines.pop()  # Output ending with a newline
+
+    records: List[Any] = []
+    for line in lines:
+        if parser is not None:
+            records.extend(parser.parse(line))
+        logging.log(loglevel, line)
+
+    return records
+
+
+def _resource_tracker_id() -> Optional[Tuple[int, int]]:
+    """Identifies the resource tracker of the current process by its pipe, which
+    forked and spawned children share unless they start their own tracker."""
+    from multiprocessing import resource_tracker
+
+    fd = resource_tracker._resource_tracker._fd  # type: ignore[attr-defined]
+    if fd is None:
+        return None
+    stat = os.fstat(fd)
+    return (stat.st_dev, stat.st_ino)
+
+
+def _parse_shared(
+    name: str,
+    size: int,
+    loglevel: int,
+    parser: Optional[Parser],
+    tracker: Optional[Tuple[int, int]],
+) -> List[Any]:
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+
+    # Only the creator of the memory may track it, or the memory is reported as leaked
+    if sys.version_info >= (3, 13):
+        memory = SharedMemory(name=name, track=False)
+    else:
+        # Attaching registers the memory with the tracker of this process. If it is
+        # the tracker of the creator, the registration is the creator's own, which it
+        # removes when unlinking the memory, so it must be kept.
+        shared = tracker is not None and _resource_tracker_id() == tracker
+        memory = SharedMemory(name=name)
+        if not shared:
+            name = memory._name  # type: ignore[attr-defined]
+            resource_tracker.unregister(name, "shared_memory")
+    try:
+        data = memory.buf[:size]  # type: ignore[index]
+        try:
+            return _parse_output(data, loglevel, parser)
+        finally:
+            data.release()  # The memory cannot be closed while views are exported
+    finally:
+        memory.close()
+
+
+async def _write_stream(
+    stream: Optional[StreamWriter],
+    data: Optional[Union[bytes, Iterable[bytes], AsyncIterable[bytes]]],
+) -> None:
+    if stream is None or data is None:
+        return
+
+    try:
+        if isinstance(data, AsyncIterable):
+            async for chunk in data:
+                stream.write(chunk)
+                await stream.drain()
+        else:
+            for chunk in [data] if isinstance(data, bytes) else data:
+                stream.write(chunk)
+                await stream.drain()
+    except (BrokenPipeError, ConnectionResetError):
+        pass  # The process exited without reading all of its input
+    finally:
+        stream.close()
+
+
+async def _drain(stream: Optional[StreamReader]) -> None:
+    if stream is not None:
+        await stream.read()
+
+
+class Backend:
+    """Creates and signals the processes of shell commands run by spawn.
+
+    The default backend runs commands as subprocesses. Other backends, e.g. those of
+    the recording module, are used within use_backend.
+    """
+
+    async def create(
+        self,
+        cmd: str,
+        stdin: bool,
+        env: Optional[Mapping[str, str]],
+        cwd: Optional[Union[str, PathLike]],
+        limit: int,
+        new_session: bool,
+    ) -> Any:
+        """Starts a shell command, in a new session if new_session, and returns its
+        process.
+
+        The process must behave like an asyncio.subprocess.Process, with stdout and
+        stderr pipes and a stdin pipe if stdin is true.
+        """
+        return await subprocess.create_subprocess_shell(
+            cmd=cmd,
+            stdin=subprocess.PIPE if stdin else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=env,
+            cwd=cwd,
+            start_new_session=new_session,
+            limit=limit,
+        )
+
+    def signal(self, process: Any, signal: int, group: bool) -> None:
+        """Sends a signal to a process created by create, or to its process group if
+        group, which requires the process to have been created in a new session."""
+        if group:
+            os.killpg(process.pid, signal)
+        else:
+            process.send_signal(signal)
+
+    def close(self, process: Any) -> None:
+        """Closes the pipes of a process created by create.
+
+        Used once the process is killed, as children which outlive it would keep them
+        open otherwise.
+        """
+        # Closing the whole transport would reap the process behind asyncio's back
+        for fd in (0, 1, 2):
+            pipe = process._transport.get_pipe_transport(fd)
+            if pipe is not None:
+                pipe.close()
+
+
+_backend: ContextVar[Backend] = ContextVar("backend", default=Backend())
+
+
+@contextmanager
+def use_backend(backend: Backend) -> Iterator[Backend]:
+    """Runs the commands spawned within the context, including by tasks created
+    within it, with backend."""
+    token = _backend.set(backend)
+    try:
+        yield backend
+    finally:
+        _backend.reset(token)
+
+
+async def _kill(process: Any, backend: Backend, group: bool) -> None:
+    """Kills a process, or its process group if group, and reaps it."""
+    if process.returncode is None:
+        try:
+            backend.signal(process, signal.SIGKILL, group)
+        except ProcessLookupError:
+            pass  # Exited in the meantime
+        if not group:
+            backend.close(process)
+    # The process is only reaped once its pipes are drained
+    await asyncio.gather(process.wait(), _drain(process.stdout), _drain(process.stderr))
+
+
+async def _cancel(tasks: Iterable[asyncio.Future[Any]]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class ProcessStats(NamedTuple):
+    """Resource usage of a process."""
+
+    user_time: float  # In seconds
+    system_time: float  # In seconds
+    rss: int  # Resident set size, in bytes
+    threads: int
+
+
+class Process:
+    """Handle of a running shell command, see spawn.
+
+    The stdin (if spawned with stdin=True), stdout and stderr of the command are pipes,
+    available as asyncio streams. Note that the command blocks once it has filled a
+    pipe, until its output is read.
+    """
+
+    def __init__(
+        self, process: Any, cmd: str, backend: Backend, new_session: bool
+    ) -> None:
+        self.cmd = cmd
+        self.stdin = process.stdin
+        self.stdout = process.stdout
+        self.stderr = process.stderr
+        self._process = process
+        self._backend = backend
+        self._new_session = new_session
+
+    def __repr__(self) -> str:
+        return f"Process(pid={self.pid!r}, cmd={self.cmd!r})"
+
+    @property
+    def pid(self) -> int:
+        """Process ID of the shell running the command."""
+        return self._process.pid
+
+    @property
+    def returncode(self) -> Optional[int]:
+        """Exit code of the command, or None if it has not exited."""
+        return self._process.returncode
+
+    def send_signal(self, signal: int) -> None:
+        """Sends a signal to the command, or to its process group if it was spawned
+        with new_session=True."""
+        self._backend.signal(self._process, signal, self._new_session)
+
+    async def write(self, data: bytes) -> None:
+        """Writes data to the stdin of the command, waiting until it can take more."""
+        if self.stdin is None:
+            raise ValueError("The command was not spawned with stdin=True")
+        self.stdin.write(data)
+        await self.stdin.drain()
+
+    async def close_stdin(self) -> None:
+        """Closes the stdin of the command, which then reads an end of file."""
+        if self.stdin is None:
+            raise ValueError("The command was not spawned with stdin=True")
+        self.stdin.close()
+        await self.stdin.wait_closed()
+
+    async def read_until(self, separator: str = "\n") -> str:
+        """Reads the stdout of the command up to and including separator.
+
+        At the end of stdout, the remaining output is returned without separator, which
+        is empty once all output has been read. Like StreamReader.readline, raises a
+        ValueError if the separator is not found within the limit of the reader.
+        """
+        if self.stdout is None:
+            return ""
+        try:
+            bdata = await self.stdout.readuntil(separator.encode())
+        except asyncio.IncompleteReadError as error:
+            bdata = error.partial
+        except asyncio.LimitOverrunError as error:
+            raise ValueError(error.args[0]) from None
+        return bdata.decode()
+
+    async def wait(self) -> int:
+        """Waits for the command to exit and returns its exit code."""
+        return await self._process.wait()
+
+    def stats(self) -> ProcessStats:
+        """Returns the current resource usage of the shell running the command.
+
+        Only supported on Linux, as the usage is read from /proc.
+        """
+        try:
+            with open(f"/proc/{self.pid}/stat") as file:
+                stat = file.read()
+        except FileNotFoundError:
+            raise ProcessLookupError(self.pid) from None
+
+        # Fields after the command name, which may contain spaces, starting at field 3
+        start = stat.rindex(")") + 2
+        fields = stat[start:].split()
+        ticks = os.sysconf("SC_CLK_TCK")
+        return ProcessStats(
+            user_time=int(fields[11]) / ticks,
+            system_time=int(fields[12]) / ticks,
+            rss=int(fields[21]) * os.sysconf("SC_PAGE_SIZE"),
+            threads=int(fields[17]),
+        )
+
+    async def kill(self) -> None:
+        """Kills the command, or its process group if it was spawned with
+        new_session=True, and waits for it to exit."""
+        await _kill(self._process, self._backend, self._new_session)
+
+
+def _env_key(env: Optional[Mapping[str, str]]) -> Optional[Hashable]:
+    if env is None or isinstance(env, FrozenEnv):
+        return env
+    return frozenset(env.items())
+
+
+@asynccontextmanager
+async def spawn(
+    args: List[str],
+    env: Optional[Mapping[str, str]] = None,
+    env_overlay: Optional[Mapping[str, str]] = None,
+    cwd: Optional[Union[str, PathLike]] = None,
+    limit: int = DEFAULT_STREAM_LIMIT,
+    stdin: bool = False,
+    new_session: bool = False,
+) -> AsyncIterator[Process]:
+    """Starts a shell command and yields a handle of it.
+
+    When leaving the context, the command is killed unless it has exited.
+
+    Args:
+        args: Command arguments to run. Arguments containing spaces will be wrapped in
+            quotes.
+        env: Environment variables of the shell command. If None, the environment of
+            the current process is inherited.
+        env_overlay: Environment variables overriding those of env.
+        cwd: Working directory of the shell command. If None, the working directory of
+            the current process is inherited.
+        limit: Buffer limit of the stdout and stderr readers, in bytes.
+        stdin: Whether to open a pipe to the stdin of the command. If false, the stdin
+            of the current process is inherited.
+        new_session: Whether to run the command in a new session, so that its whole
+            process group is signalled and killed rather than only the shell. The
+            command then has no controlling terminal, e.g. for password prompts.
+    Yields:
+        The handle of the command.
+    """
+    cmd = join_args(args)
+    backend = _backend.get()
+    process = await backend.create(
+        cmd, stdin, resolve_env(env, env_overlay), cwd, limit, new_session
+    )
+
+    try:
+        yield Process(process, cmd, backend, new_session)
+    finally:
+        if process.returncode is None:
+            await _kill(process, backend, new_session)
+
+
 async def sh(
     args: List[str],
     stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
     stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
     check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    stdout_parser: Optional[Parser] = None,
+    stderr_parser: Optional[Parser] = None,
+    retain_output: bool = DEFAULT_RETAIN_OUTPUT,
+    output_log: Optional[OutputLog] = None,
+    env: Optional[Mapping[str, str]] = None,
+    env_overlay: Optional[Mapping[str, str]] = None,
+    cwd: Optional[Union[str, PathLike]] = None,
+    stdout_callback: Optional[OutputCallback] = None,
+    stderr_callback: Optional[OutputCallback] = None,
+    limit: int = DEFAULT_STREAM_LIMIT,
+    input: Optional[Union[bytes, Iterable[bytes], AsyncIterable[bytes]]] = None,
+    executor: Optional[Executor] = None,
+    single_flight: Union[bool, SingleFlight] = False,
+    new_session: bool = False,
 ) -> ProcessInfo:
     """Runs a shell command.
 
+    If sh fails or is cancelled before the command has exited, e.g. because a parser or
+    callback raised, the command is killed.
+
     Args:
         args: Command arguments to run. Arguments containing spaces will be wrapped in
             quotes.
@@ -44,29 +493,216 @@ async def sh(
         stderr_log_level: Log level of the stderr of the shell command.
         check_exitcode: Whether to check if the exit code is zero or not. If true and
             exitcode is non-zero, a CalledProcessError will be raised.
+        stdout_parser: Parser fed with every line of stdout as it is read.
+        stderr_parser: Parser fed with every line of stderr as it is read.
+        retain_output: Whether to retain the stdout and stderr of the shell command. If
+            false, the returned stdout and stderr are empty, which saves memory when
+            the output is only consumed through parsers.
+        output_log: Log to which the stdout and stderr are appended, interleaved in the
+            order they are read.
+        env: Environment variables of the shell command. If None, the environment of
+            the current process is inherited.
+        env_overlay: Environment variables overriding those of env. The overlay is
+            merged into a new dict on every call, unless both env and env_overlay are
+            FrozenEnvs, whose overlays are cached.
+        cwd: Working directory of the shell command. If None, the working directory of
+            the current process is inherited.
+        stdout_callback: Coroutine function awaited with every line of stdout as it is
+            read, e.g. the put method of a bounded asyncio.Queue. No more output is read
+            until it returns, so a slow callback pauses the command once the pipe
+            buffers are full, rather than buffering its output unboundedly.
+        stderr_callback: Like stdout_callback, but for the lines of stderr.
+        limit: Buffer limit of the stdout and stderr readers, in bytes. Lines longer
+            than this raise a ValueError.
+        input: Data written to the stdin of the shell command, either as bytes or as an
+            iterable or async iterable of chunks, which are written one at a time as the
+            command reads them. If None, the stdin of the current process is inherited.
+        executor: Executor to hand the parsing and logging of the output lines to, so
+            that they do not block the event loop. The output is then processed once
+            the command has exited, and the output callbacks cannot be used. With a
+            ProcessPoolExecutor, parsers are pickled without their callback, their
+            records are delivered in the current process and outputs of at least 1 MiB
+            are passed through shared memory. Note that worker processes log with their
+            own logging configuration, which forked workers inherit.
+        single_flight: Whether to collapse the call with an identical call which is
+            already running, awaiting its result instead of running the command again.
+            Calls are identical if their args, env, env_overlay, cwd, input and the
+            other arguments affecting the result are. Either true to collapse calls in
+            DEFAULT_SINGLE_FLIGHT, or the SingleFlight group to collapse calls in.
+            Calls with parsers, callbacks, an output log or an iterable input cannot
+            be collapsed.
+        new_session: Whether to run the command in a new session, so that its whole
+            process group is killed rather than only the shell. The command then has
+            no controlling terminal, e.g. for password prompts.
     Returns:
         A ProcessInfo containing the exitcode, stdout, and stderr from the command.
     Raises:
         CalledProcessError: If the shell command exited with a non-zero exitcode and
             check_exitcode is true.
+        ValueError: If both an executor and output callbacks are given, or if
+            single_flight is set for a call which cannot be collapsed.
     """
-    # Wrap args containing whitespace with quotes
-    args = [f'"{arg}"' if " " in arg else arg for arg in args]
-    cmd = " ".join(args)
-
-    process = await subprocess.create_subprocess_shell(
-        cmd=cmd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-    )
+    if executor is not None and (stdout_callback or stderr_callback):
+        raise ValueError("Output callbacks cannot be used with an executor")
 
-    exitcode, stdout, stderr = await asyncio.gather(
-        process.wait(),
-        _read_stream(process.stdout, stdout_log_level),
-        _read_stream(process.stderr, stderr_log_level),
-    )
+    if single_flight:
+        side_effects = (
+            stdout_parser,
+            stderr_parser,
+            output_log,
+            stdout_callback,
+            stderr_callback,
+        )
+        if any(x is not None for x in side_effects) or not isinstance(
+            input, (bytes, type(None))
+        ):
+            raise ValueError(
+                "Calls with parsers, callbacks, an output log or an iterable input "
+                "cannot be collapsed"
+            )
+
+        key = (
+            join_args(args),
+            check_exitcode,
+            retain_output,
+            _env_key(env),
+            _env_key(env_overlay),
+            None if cwd is None else os.fspath(cwd),
+            limit,
+            input,
+        )
+        group = DEFAULT_SINGLE_FLIGHT if single_flight is True else single_flight
+        return await group.run(
+            key,
+            partial(
+                sh,
+                args=args,
+                stdout_log_level=stdout_log_level,
+                stderr_log_level=stderr_log_level,
+                check_exitcode=check_exitcode,
+                retain_output=retain_output,
+                env=env,
+                env_overlay=env_overlay,
+                cwd=cwd,
+                limit=limit,
+                input=input,
+                executor=executor,
+                new_session=new_session,
+            ),
+        )
+
+    async with spawn(
+        args,
+        env,
+        env_overlay,
+        cwd,
+        limit,
+        stdin=input is not None,
+        new_session=new_session,
+    ) as process:
+        if executor is None:
+            readers = [
+                _read_stream(
+                    process.stdout,
+                    stdout_log_level,
+                    stdout_parser,
+                    retain_output,
+                    output_log,
+                    STDOUT,
+                    stdout_callback,
+                ),
+                _read_stream(
+                    process.stderr,
+                    stderr_log_level,
+                    stderr_parser,
+                    retain_output,
+                    output_log,
+                    STDERR,
+                    stderr_callback,
+                ),
+            ]
+        else:
+            readers = [
+                _read_offloaded(
+                    process.stdout,
+                    stdout_log_level,
+                    stdout_parser,
+                    retain_output,
+                    output_log,
+                    STDOUT,
+                    executor,
+                ),
+                _read_offloaded(
+                    process.stderr,
+                    stderr_log_level,
+                    stderr_parser,
+                    retain_output,
+                    output_log,
+                    STDERR,
+                    executor,
+                ),
+            ]
+
+        tasks: List[asyncio.Future[Any]] = [
+            asyncio.ensure_future(process.wait()),
+            *map(asyncio.ensure_future, readers),
+            asyncio.ensure_future(_write_stream(process.stdin, input)),
+        ]
+
+        try:
+            exitcode, stdout, stderr, _ = await asyncio.gather(*tasks)
+        except BaseException:
+            await _cancel(tasks)  # The command is killed when leaving the context
+            raise
 
     if check_exitcode and exitcode != 0:
-        raise CalledProcessError(exitcode, cmd, stdout, stderr)
+        raise CalledProcessError(exitcode, process.cmd, stdout, stderr)
 
     return ProcessInfo(exitcode, stdout, stderr)
+
+
+async def sh_lines(
+    args: List[str],
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+    check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    limit: int = DEFAULT_STREAM_LIMIT,
+    new_session: bool = False,
+) -> AsyncGenerator[str, None]:
+    """Runs a shell command, yielding the lines of its stdout as they are read.
+
+    If the iteration is stopped before the command has exited, the command is killed.
+
+    Args:
+        args: Command arguments to run. Arguments containing spaces will be wrapped in
+            quotes.
+        stdout_log_level: Log level of the stdout of the shell command.
+        stderr_log_level: Log level of the stderr of the shell command.
+        check_exitcode: Whether to check if the exit code is zero or not. If true and
+            exitcode is non-zero, a CalledProcessError will be raised.
+        limit: Buffer limit of the stdout and stderr readers, in bytes. Lines longer
+            than this raise a ValueError.
+        new_session: Whether to run the command in a new session, so that its whole
+            process group is killed rather than only the shell. The command then has
+            no controlling terminal, e.g. for password prompts.
+    Yields:
+        The lines of stdout, without trailing newlines.
+    Raises:
+        CalledProcessError: If the shell command exited with a non-zero exitcode and
+            check_exitcode is true.
+    """
+    async with spawn(args, limit=limit, new_session=new_session) as process:
+        stderr = asyncio.ensure_future(_read_stream(process.stderr, stderr_log_level))
+
+        try:
+            while line := await process.read_until():
+                line = line.rstrip("\n")  # Remove trailing newline
+
+                logging.log(stdout_log_level, line)
+                yield line
+
+            exitcode, errors = await asyncio.gather(process.wait(), stderr)
+            if check_exitcode and exitcode != 0:
+                raise CalledProcessError(exitcode, process.cmd, None, errors)
+        finally:
+            await _cancel([stderr])
@@ -0,0 +1,36 @@
+from typing import Awaitable, Callable, List, NamedTuple
+
+# Defaults
+DEFAULT_STDOUT_LOG_LEVEL = 20  # logging.INFO
+DEFAULT_STDERR_LOG_LEVEL = 40  # logging.ERROR
+DEFAULT_CHECK_EXITCODE = True
+DEFAULT_RETAIN_OUTPUT = True
+DEFAULT_STREAM_LIMIT = 2**16  # 64 KiB, as asyncio
+
+OutputCallback = Callable[[str], Awaitable[None]]
+
+
+class ProcessInfo(NamedTuple):
+    exitcode: int
+    stdout: str
+    stderr: str
+
+
+def join_args(args: List[str]) -> str:
+    """Joins command arguments into a shell command, quoting those with spaces."""
+    # Wrap args containing whitespace with quotes
+    args = [f'"{arg}"' if " " in arg else arg for arg in args]
+    return " ".join(args)
+
+
+def quote_arg(arg: str) -> str:
+    """Quotes a command argument, so that join_args passes it to the command verbatim,
+    without the shell expanding variables or interpreting quotes and semicolons in it.
+    """
+    if " " in arg:
+        # Wrapped in double quotes by join_args, within which these are special
+        return "".join(f"\\{char}" if char in '\\$"`' else char for char in arg)
+
+    import shlex  # Imported lazily to keep importing pyshell2 cheap
+
+    return shlex.quote(arg)
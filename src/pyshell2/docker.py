@@ -1,15 +1,22 @@
-import asyncio
-from pathlib import Path
-from typing import Dict, List, Optional, Union
+from __future__ import annotations
 
-from . import asyncdocker
-from .shell import (
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Union
+
+from .core import (
     DEFAULT_CHECK_EXITCODE,
     DEFAULT_STDERR_LOG_LEVEL,
     DEFAULT_STDOUT_LOG_LEVEL,
     ProcessInfo,
 )
 
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from .asyncdocker import BuildContext, DockerBuild
+    from .dockerplan import DockerRunPlan
+    from .results import ResultSet
+    from .singleflight import SingleFlight
+
 
 def docker_sh(
     image: str,
@@ -20,12 +27,22 @@ def docker_sh(
     stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
     stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
     check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    env: Optional[Mapping[str, str]] = None,
+    env_file: Optional[Path] = None,
+    workdir: Optional[str] = None,
+    transfer: bool = False,
+    outputs: Optional[List[Path]] = None,
+    tmpfs: Optional[List[str]] = None,
+    caches: Optional[Mapping[str, str]] = None,
+    single_flight: Union[bool, SingleFlight] = False,
 ) -> ProcessInfo:
     """Runs a shell command inside a docker image.
 
     This is a easier to use version of docker_run with some automagic features. The
     current automagic features include:
     - Automatic mounting of files and directories in the command args.
+    - Alternatively, automatic copying of files and directories in the command args
+      into the container, and of outputs back out of it.
 
     The benefit of using this function is cleaner code and you less to think about. The
     downside is less control. If you need full functionality use the parent function
@@ -44,12 +61,38 @@ def docker_sh(
         stderr_log_level: Log level of the stderr of the shell command.
         check_exitcode: Whether to check if the exit code is zero or not. If true and
             exitcode is non-zero, a CalledProcessError will be raised.
+        env: Environment variables to set in the container. See "--env" arg for docker
+            run for more info.
+        env_file: File of environment variables to set in the container. See
+            "--env-file" arg for docker run for more info.
+        workdir: Working directory of the command inside the container. See "--workdir"
+            arg for docker run for more info.
+        transfer: Whether to copy the paths in the command args into the container,
+            streamed as a tar archive over the stdin of "docker cp", instead of
+            mounting them. Unlike mounts, this works with remote docker daemons.
+        outputs: Paths in the command args written by the command. If transfer is
+            true, they are copied back out of the container once the command exited
+            with a zero exitcode. Otherwise they are written through their mounts.
+        tmpfs: Paths inside the container to mount a tmpfs on, for scratch data which
+            would otherwise be written to the slow writable layer of the container. See
+            "--tmpfs" arg for docker run for more info.
+        caches: Named volumes to mount, mapped to their path inside the container,
+            e.g. to reuse a package cache across runs. The volumes are created by
+            ensure_cache on first use and can be removed with prune_caches.
+        single_flight: Whether to collapse the call with an identical call which is
+            already running, see sh. Calls are identical if their docker commands,
+            including the image, mounts and env, and their files and outputs are.
     Returns:
         A ProcessInfo containing the exitcode, stdout, and stderr from the command.
     Raises:
         CalledProcessError: If the shell command exited with a non-zero exitcode and
             check_exitcode is true.
+        ValueError: If an output is not in the command args.
     """
+    import asyncio
+
+    from . import asyncdocker
+
     return asyncio.run(
         asyncdocker.docker_sh(
             image=image,
@@ -60,6 +103,14 @@ def docker_sh(
             stdout_log_level=stdout_log_level,
             stderr_log_level=stderr_log_level,
             check_exitcode=check_exitcode,
+            env=env,
+            env_file=env_file,
+            workdir=workdir,
+            tmpfs=tmpfs,
+            caches=caches,
+            transfer=transfer,
+            outputs=outputs,
+            single_flight=single_flight,
         )
     )
 
@@ -76,8 +127,18 @@ def docker_run(
     stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
     stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
     check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    env: Optional[Mapping[str, str]] = None,
+    env_file: Optional[Path] = None,
+    workdir: Optional[str] = None,
+    tmpfs: Optional[List[str]] = None,
+    caches: Optional[Mapping[str, str]] = None,
+    single_flight: Union[bool, SingleFlight] = False,
 ) -> ProcessInfo:
     """Runs a docker run command."""
+    import asyncio
+
+    from . import asyncdocker
+
     return asyncio.run(
         asyncdocker.docker_run(
             image=image,
@@ -91,5 +152,177 @@ def docker_run(
             stdout_log_level=stdout_log_level,
             stderr_log_level=stderr_log_level,
             check_exitcode=check_exitcode,
+            env=env,
+            env_file=env_file,
+            workdir=workdir,
+            tmpfs=tmpfs,
+            caches=caches,
+            single_flight=single_flight,
+        )
+    )
+
+
+def docker_run_plans(
+    plans: Iterable[DockerRunPlan],
+    max_concurrency: Optional[int] = None,
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+    check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    as_result_set: bool = False,
+) -> Union[List[ProcessInfo], ResultSet]:
+    """Runs the docker run commands of plans concurrently.
+
+    Args:
+        plans: Plans of the docker run commands to run.
+        max_concurrency: Maximum number of commands running at once. If None, all
+            commands are run at once.
+        stdout_log_level: Log level of the stdout of the shell commands.
+        stderr_log_level: Log level of the stderr of the shell commands.
+        check_exitcode: Whether to check if the exit codes are zero or not. If true and
+            any exitcode is non-zero, a CalledProcessError will be raised.
+        as_result_set: Whether to return the results as a ResultSet, which stores
+            them far more compactly than a list of ProcessInfos.
+    Returns:
+        A ProcessInfo of every plan, in the order of the plans, as a list or as a
+        ResultSet if as_result_set is true.
+    Raises:
+        CalledProcessError: If any shell command exited with a non-zero exitcode and
+            check_exitcode is true.
+    """
+    import asyncio
+
+    from . import asyncdocker
+
+    return asyncio.run(
+        asyncdocker.docker_run_plans(
+            plans=plans,
+            max_concurrency=max_concurrency,
+            stdout_log_level=stdout_log_level,
+            stderr_log_level=stderr_log_level,
+            check_exitcode=check_exitcode,
+            as_result_set=as_result_set,
+        )
+    )
+
+
+def docker_build(
+    context: BuildContext,
+    tag: Optional[str] = None,
+    dockerfile: Optional[str] = None,
+    build_args: Optional[Mapping[str, str]] = None,
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+) -> str:
+    """Builds a docker image.
+
+    The build context is archived on the fly and streamed to docker build through stdin,
+    one file at a time, so it is never staged on disk.
+
+    Args:
+        context: Build context, either a directory or a mapping of file names (relative
+            to the root of the context) to file contents.
+        tag: Name and optionally a tag of the image. See "--tag" arg for docker build
+            for more info.
+        dockerfile: Name of the Dockerfile within the context. See "--file" arg for
+            docker build for more info.
+        build_args: Build-time variables. See "--build-arg" arg for docker build for
+            more info.
+        stdout_log_level: Log level of the stdout of the build.
+        stderr_log_level: Log level of the stderr of the build. Note that docker writes
+            the build progress to stderr.
+    Returns:
+        The ID of the image, usable to run exactly this image even if the tag is moved.
+    Raises:
+        CalledProcessError: If the build failed.
+    """
+    import asyncio
+
+    from . import asyncdocker
+
+    return asyncio.run(
+        asyncdocker.docker_build(
+            context=context,
+            tag=tag,
+            dockerfile=dockerfile,
+            build_args=build_args,
+            stdout_log_level=stdout_log_level,
+            stderr_log_level=stderr_log_level,
+        )
+    )
+
+
+def docker_build_all(
+    builds: Mapping[str, DockerBuild],
+    max_concurrency: Optional[int] = None,
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+) -> Dict[str, str]:
+    """Builds docker images concurrently.
+
+    See docker_build for more info.
+
+    Args:
+        builds: Build of every image, by the tag of the image.
+        max_concurrency: Maximum number of builds running at once. If None, all images
+            are built at once.
+        stdout_log_level: Log level of the stdout of the builds.
+        stderr_log_level: Log level of the stderr of the builds. Note that docker writes
+            the build progress to stderr.
+    Returns:
+        The ID of every image, by the tag of the image.
+    Raises:
+        CalledProcessError: If any build failed.
+    """
+    import asyncio
+
+    from . import asyncdocker
+
+    return asyncio.run(
+        asyncdocker.docker_build_all(
+            builds=builds,
+            max_concurrency=max_concurrency,
+            stdout_log_level=stdout_log_level,
+            stderr_log_level=stderr_log_level,
         )
     )
+
+
+def ensure_cache(name: str) -> str:
+    """Creates a named volume to use as a cache, unless it already exists.
+
+    The volume is labelled as a cache, so that it is pruned by prune_caches. Only the
+    first call per name and process runs docker.
+
+    Args:
+        name: Name of the volume.
+    Returns:
+        The name of the volume.
+    """
+    import asyncio
+
+    from . import asyncdocker
+
+    return asyncio.run(asyncdocker.ensure_cache(name=name))
+
+
+def prune_caches(
+    max_age: Optional[float] = None,
+    max_size: Optional[int] = None,
+) -> List[str]:
+    """Removes the volumes created by ensure_cache which are too old or too large.
+
+    Caches in use by a container are never removed.
+
+    Args:
+        max_age: Maximum age of a cache since it was created, in seconds. If None,
+            caches are not removed by age.
+        max_size: Maximum total size of the caches, in bytes. The oldest caches are
+            removed until the caches fit. If None, caches are not removed by size.
+    Returns:
+        The names of the removed caches.
+    """
+    import asyncio
+
+    from . import asyncdocker
+
+    return asyncio.run(asyncdocker.prune_caches(max_age=max_age, max_size=max_size))
@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from pyshell2.core import quote_arg
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+class DockerRunPlan(NamedTuple):
+    """Immutable plan of a docker run command.
+
+    Plans are hashable and can be serialized with to_dict. Use create to build a plan
+    from the arguments of docker_run, and with_args to reuse a template plan with
+    varying args. The argv of everything but the args is cached per template, so
+    building the argv of many plans sharing a template is cheap.
+    """
+
+    image: str
+    args: Tuple[str, ...] = ()
+    detached: bool = False
+    cleanup: bool = True
+    user: Optional[str] = None
+    entrypoint: Optional[str] = None
+    volumes: Tuple[Tuple[Path, Path], ...] = ()
+    network: Optional[str] = None
+    env: Tuple[Tuple[str, str], ...] = ()
+    env_file: Optional[Path] = None
+    workdir: Optional[str] = None
+    tmpfs: Tuple[str, ...] = ()
+    caches: Tuple[Tuple[str, str], ...] = ()
+
+    @classmethod
+    def create(
+        cls,
+        image: str,
+        args: Iterable[str] = (),
+        detached: bool = False,
+        cleanup: bool = True,
+        user: Optional[str] = None,
+        entrypoint: Optional[str] = None,
+        volumes: Optional[Dict[Path, Path]] = None,
+        network: Optional[str] = None,
+        env: Optional[Mapping[str, str]] = None,
+        env_file: Optional[Path] = None,
+        workdir: Optional[str] = None,
+        tmpfs: Optional[List[str]] = None,
+        caches: Optional[Mapping[str, str]] = None,
+    ) -> DockerRunPlan:
+        """Creates a plan from the arguments of docker_run.
+
+        Volume paths are resolved when the plan is created.
+        """
+        return cls(
+            image=image,
+            args=tuple(args),
+            detached=detached,
+            cleanup=cleanup,
+            user=user,
+            entrypoint=entrypoint,
+            volumes=tuple(
+                (src.resolve(), dst.resolve()) for src, dst in (volumes or {}).items()
+            ),
+            network=network,
+            env=tuple((env or {}).items()),
+            env_file=env_file,
+            workdir=workdir,
+            tmpfs=tuple(tmpfs or ()),
+            caches=tuple((caches or {}).items()),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> DockerRunPlan:
+        """Creates a plan from a dict created by to_dict."""
+        from pathlib import Path  # Imported lazily to keep importing pyshell2 cheap
+
+        return cls(
+            **{
+                **data,
+                "args": tuple(data["args"]),
+                "volumes": tuple(
+                    (Path(src), Path(dst)) for src, dst in data["volumes"]
+                ),
+                "env": tuple((key, value) for key, value in data["env"]),
+                "env_file": None
+                if data["env_file"] is None
+                else Path(data["env_file"]),
+                "tmpfs": tuple(data.get("tmpfs", ())),
+                "caches": tuple((name, dst) for name, dst in data.get("caches", ())),
+            }
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns the plan as a JSON serializable dict."""
+        return {
+            **self._asdict(),
+            "args": list(self.args),
+            "volumes": [[str(src), str(dst)] for src, dst in self.volumes],
+            "env": [[key, value] for key, value in self.env],
+            "env_file": None if self.env_file is None else str(self.env_file),
+            "tmpfs": list(self.tmpfs),
+            "caches": [[name, dst] for name, dst in self.caches],
+        }
+
+    def with_args(self, args: Iterable[str]) -> DockerRunPlan:
+        """Returns a copy of the plan with other args."""
+        return self._replace(args=tuple(args))
+
+    @property
+    def argv(self) -> List[str]:
+        """The docker run command of the plan."""
+        return [*_argv_prefix(self._replace(args=())), *self.args]
+
+    @property
+    def create_argv(self) -> List[str]:
+        """The docker create command of the plan, which ignores detached and cleanup."""
+        return ["docker", "create", *_options(self._replace(args=())), *self.args]
+
+
+@lru_cache(maxsize=1024)
+def _argv_prefix(plan: DockerRunPlan) -> Tuple[str, ...]:
+    return (
+        "docker",
+        "run",
+        f"-d={str(plan.detached).lower()}",
+        f"--rm={str(plan.cleanup).lower()}",
+        *_options(plan),
+    )
+
+
+@lru_cache(maxsize=1024)
+def _options(plan: DockerRunPlan) -> Tuple[str, ...]:
+    cmd: List[str] = []
+
+    if plan.user is not None:
+        cmd += ["--user", plan.user]
+
+    if plan.entrypoint is not None:
+        cmd += ["--entrypoint", plan.entrypoint]
+
+    for src, dst in plan.volumes:
+        escaped_quote = '\\"'
+        mount = [
+            "type=bind",
+            f"{escaped_quote}src={src}{escaped_quote}",
+            f"{escaped_quote}dst={dst}{escaped_quote}",
+        ]
+        cmd += ["--mount", ",".join(mount)]
+
+    for path in plan.tmpfs:
+        cmd += ["--tmpfs", path]
+
+    for name, path in plan.caches:
+        cmd += ["--mount", f"type=volume,src={name},dst={path}"]
+
+    if plan.network is not None:
+        cmd += ["--network", plan.network]
+
+    for key, value in plan.env:
+        cmd += ["--env", quote_arg(f"{key}={value}")]
+
+    if plan.env_file is not None:
+        cmd += ["--env-file", str(plan.env_file)]
+
+    if plan.workdir is not None:
+        cmd += ["--workdir", plan.workdir]
+
+    return (*cmd, plan.image)
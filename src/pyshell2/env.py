@@ -0,0 +1,72 @@
+import os
+from functools import lru_cache
+from typing import Dict, Iterator, Mapping, Optional
+
+
+class FrozenEnv(Mapping[str, str]):
+    """Immutable and hashable mapping of environment variables.
+
+    A frozen env is meant to be created once and shared across many commands. Overlays
+    of frozen envs on each other are cached, so sh does not merge them per command. Note
+    that subprocess still encodes the env for every process it spawns.
+
+    An overlay on the inherited env is merged per command, since os.environ may change
+    in between. Use from_environ to snapshot os.environ once and cache overlays on it.
+    """
+
+    __slots__ = ("_env", "_hash")
+
+    def __init__(self, env: Mapping[str, str] = {}) -> None:
+        self._env: Dict[str, str] = dict(env)
+        self._hash: Optional[int] = None
+
+    def __getitem__(self, key: str) -> str:
+        return self._env[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._env)
+
+    def __len__(self) -> int:
+        return len(self._env)
+
+    def __hash__(self) -> int:
+        if self._hash is None:
+            self._hash = hash(frozenset(self._env.items()))
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"FrozenEnv({self._env!r})"
+
+    @classmethod
+    def from_environ(cls) -> "FrozenEnv":
+        """Returns a frozen snapshot of the env of the current process."""
+        return cls(os.environ)
+
+    def overlay(self, overlay: Mapping[str, str]) -> "FrozenEnv":
+        """Returns a frozen env of these variables, overridden by those of overlay."""
+        if not isinstance(overlay, FrozenEnv):
+            overlay = FrozenEnv(overlay)
+        return _overlay(self, overlay)
+
+
+@lru_cache(maxsize=256)
+def _overlay(env: FrozenEnv, overlay: FrozenEnv) -> FrozenEnv:
+    return FrozenEnv({**env, **overlay})
+
+
+def resolve_env(
+    env: Optional[Mapping[str, str]],
+    env_overlay: Optional[Mapping[str, str]],
+) -> Optional[Mapping[str, str]]:
+    """Returns the env of a process given its env and env overlay.
+
+    None means the process inherits the env of the current process. Overlays of frozen
+    envs on frozen envs are cached, any other overlay is merged into a new dict.
+    """
+    if env_overlay is None:
+        return env
+
+    if isinstance(env, FrozenEnv) and isinstance(env_overlay, FrozenEnv):
+        return env.overlay(env_overlay)
+
+    return {**(os.environ if env is None else env), **env_overlay}
@@ -0,0 +1,77 @@
+import time
+from array import array
+from typing import Callable, Iterator, NamedTuple, Optional, Tuple
+
+# Streams
+STDOUT = 1
+STDERR = 2
+
+
+class OutputEvent(NamedTuple):
+    timestamp: float
+    stream: int
+    offset: int
+    data: memoryview
+
+
+class OutputLog:
+    """Ordered log of output chunks from one or more streams.
+
+    All chunks are stored back to back in a single buffer, in the order they were read,
+    alongside compact arrays of their stream, start offset and timestamp. Views of the
+    output are memoryviews into the buffer, so no bytes are duplicated.
+
+    Views are snapshots: they can be held while the log is still being appended to, e.g.
+    by an output callback of sh. Appending while views are held moves the log to a new
+    buffer, leaving the views the old one.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.data = bytearray()
+        self.streams = array("B")
+        self.offsets = array("Q")
+        self.timestamps = array("d")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[OutputEvent]:
+        for i, data in self._spans():
+            yield OutputEvent(
+                self.timestamps[i], self.streams[i], self.offsets[i], data
+            )
+
+    def append(self, stream: int, data: bytes) -> None:
+        self.timestamps.append(self.clock())
+        self.streams.append(stream)
+        self.offsets.append(len(self.data))
+        try:
+            self.data += data
+        except BufferError:  # A view is held, so the buffer cannot be resized
+            self.data = self.data + data
+
+    def chunks(self, stream: Optional[int] = None) -> Iterator[memoryview]:
+        """Yields the chunks of a stream, or of all streams if stream is None."""
+        for i, data in self._spans():
+            if stream is None or self.streams[i] == stream:
+                yield data
+
+    def view(self) -> memoryview:
+        """Returns the combined output of all streams, in the order it was read."""
+        return memoryview(self.data)
+
+    def text(self, stream: Optional[int] = None) -> str:
+        """Decodes the output of a stream, or the combined output if stream is None."""
+        if stream is None:
+            return self.data.decode()
+        return b"".join(self.chunks(stream)).decode()
+
+    def _spans(self) -> Iterator[Tuple[int, memoryview]]:
+        # Chunks appended after the iteration started are not part of the snapshot
+        data = memoryview(self.data)
+        n = len(self.offsets)
+        for i in range(n):
+            start = self.offsets[i]
+            end = self.offsets[i + 1] if i + 1 < n else len(data)
+            yield i, data[start:end]
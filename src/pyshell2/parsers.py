@@ -0,0 +1,138 @@
+import re
+from abc import ABC, abstractmethod
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Union,
+)
+
+RecordCallback = Callable[[Any], None]
+
+
+class Parser(ABC):
+    """Incremental parser of command output.
+
+    Lines are fed to the parser one at a time, as they are read from the process, and
+    every parsed record is delivered to the callback (if any) and collected in records
+    (if retain_records is true).
+
+    Parsers are pickled without their callback and records, so that copies can parse
+    output in worker processes, see the executor argument of sh.
+    """
+
+    def __init__(
+        self,
+        callback: Optional[RecordCallback] = None,
+        retain_records: bool = True,
+    ) -> None:
+        self.callback = callback
+        self.retain_records = retain_records
+        self.records: List[Any] = []
+
+    def __getstate__(self) -> Dict[str, Any]:
+        return {**self.__dict__, "callback": None, "records": []}
+
+    def feed(self, line: str) -> None:
+        self.add(self.parse(line))
+
+    def add(self, records: Iterable[Any]) -> None:
+        """Delivers records parsed elsewhere, e.g. by a copy of the parser."""
+        for record in records:
+            if self.retain_records:
+                self.records.append(record)
+            if self.callback is not None:
+                self.callback(record)
+
+    @abstractmethod
+    def parse(self, line: str) -> Iterable[Any]:
+        """Parses a single line (without trailing newline) into zero or more records."""
+
+
+class JsonLinesParser(Parser):
+    """Parses every non-blank line as a JSON document."""
+
+    def __init__(
+        self,
+        callback: Optional[RecordCallback] = None,
+        retain_records: bool = True,
+    ) -> None:
+        super().__init__(callback=callback, retain_records=retain_records)
+        self._decode = _json_decoder()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = super().__getstate__()
+        del state["_decode"]  # The decoder cannot be pickled
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state, _decode=_json_decoder())
+
+    def parse(self, line: str) -> Iterable[Any]:
+        if line and not line.isspace():
+            yield self._decode(line)
+
+
+def _json_decoder() -> Callable[[str], Any]:
+    import json  # Imported lazily to keep importing pyshell2 cheap
+
+    return json.JSONDecoder().decode
+
+
+class DelimitedParser(Parser):
+    """Splits every non-empty line on a delimiter.
+
+    Records are lists of fields, or dicts if field names are given.
+    """
+
+    def __init__(
+        self,
+        delimiter: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None,
+        callback: Optional[RecordCallback] = None,
+        retain_records: bool = True,
+    ) -> None:
+        super().__init__(callback=callback, retain_records=retain_records)
+        self.delimiter = delimiter
+        self.fields = None if fields is None else tuple(fields)
+
+    def parse(self, line: str) -> Iterable[Any]:
+        if not line:
+            return
+
+        values = line.split(self.delimiter)
+        yield values if self.fields is None else dict(zip(self.fields, values))
+
+
+class RegexParser(Parser):
+    """Extracts a record from every line matching a regular expression.
+
+    Records are the dict of named groups if the pattern has any, else the tuple of
+    groups, else the matched string. Lines not matching the pattern are skipped.
+    """
+
+    def __init__(
+        self,
+        pattern: Union[str, Pattern[str]],
+        callback: Optional[RecordCallback] = None,
+        retain_records: bool = True,
+    ) -> None:
+        super().__init__(callback=callback, retain_records=retain_records)
+        self.pattern = re.compile(pattern)
+
+    def parse(self, line: str) -> Iterable[Any]:
+        match = self.pattern.search(line)
+        if match is None:
+            return
+
+        if self.pattern.groupindex:
+            yield match.groupdict()
+        elif self.pattern.groups:
+            yield match.groups()
+        else:
+            yield match.group()
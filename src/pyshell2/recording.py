@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import time
+from asyncio import StreamReader
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from os import PathLike
+from typing import IO, Any, Deque, Dict, Iterator, List, Mapping, Optional, Union
+
+from pyshell2.asyncshell import Backend, use_backend
+from pyshell2.outputlog import STDERR, STDOUT
+
+# Size of the chunks read from the outputs of recorded commands
+_CHUNK_SIZE = 2**16
+
+
+def _encode(data: bytes) -> str:
+    return data.decode(errors="surrogateescape")
+
+
+def _decode(text: str) -> bytes:
+    return text.encode(errors="surrogateescape")
+
+
+class _RecordedProcess:
+    """Process whose outputs are recorded while they are passed through."""
+
+    def __init__(self, process: Any, cmd: str, limit: int, file: IO[str]) -> None:
+        self.cmd = cmd
+        self.pid = process.pid
+        self.stdin = process.stdin
+        self.stdout = StreamReader(limit=limit)
+        self.stderr = StreamReader(limit=limit)
+        self.chunks: List[List[Any]] = []
+        self._process = process
+        self._file = file
+        self._start = time.monotonic()
+        # Recorded once the command exits, whether or not it is waited for
+        self._recording = asyncio.ensure_future(self._record())
+
+    @property
+    def returncode(self) -> Optional[int]:
+        return self._process.returncode
+
+    async def _pump(self, source: StreamReader, sink: StreamReader, fd: int) -> None:
+        # Outputs are read eagerly, so a recorded command does not block on full pipes
+        while data := await source.read(_CHUNK_SIZE):
+            self.chunks.append([self._elapsed(), fd, _encode(data)])
+            sink.feed_data(data)
+        sink.feed_eof()
+
+    def _elapsed(self) -> float:
+        return round(time.monotonic() - self._start, 6)
+
+    async def _record(self) -> int:
+        exitcode, *_ = await asyncio.gather(
+            self._process.wait(),
+            self._pump(self._process.stdout, self.stdout, STDOUT),
+            self._pump(self._process.stderr, self.stderr, STDERR),
+        )
+        record = {
+            "cmd": self.cmd,
+            "exitcode": exitcode,
+            "duration": self._elapsed(),
+            "chunks": self.chunks,
+        }
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        return exitcode
+
+    async def wait(self) -> int:
+        return await asyncio.shield(self._recording)
+
+
+class Recorder(Backend):
+    """Backend running commands as subprocesses and recording them to a file.
+
+    For each command, its command line, the output chunks with the time they were read
+    at, its exit code and its duration are written as a JSON line once the command has
+    exited, including when it is killed. Only commands spawned through the backend are
+    recorded, which excludes those run by shell.sh_direct, as it runs them without an
+    event loop.
+    """
+
+    def __init__(self, file: IO[str]) -> None:
+        self.file = file
+
+    async def create(
+        self,
+        cmd: str,
+        stdin: bool,
+        env: Optional[Mapping[str, str]],
+        cwd: Optional[Union[str, PathLike]],
+        limit: int,
+        new_session: bool,
+    ) -> Any:
+        process = await super().create(cmd, stdin, env, cwd, limit, new_session)
+        return _RecordedProcess(process, cmd, limit, self.file)
+
+    def signal(self, process: Any, signal: int, group: bool) -> None:
+        super().signal(process._process, signal, group)
+
+    def close(self, process: Any) -> None:
+        super().close(process._process)
+
+
+class _Sink:
+    """Stdin of a replayed command, which discards what is written to it."""
+
+    def write(self, data: bytes) -> None:
+        pass
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    async def wait_closed(self) -> None:
+        pass
+
+
+class _ReplayedProcess:
+    """Process serving the recorded outputs of a command."""
+
+    pid = -1
+
+    def __init__(
+        self, record: Dict[str, Any], stdin: bool, limit: int, speed: float
+    ) -> None:
+        self.stdin = _Sink() if stdin else None
+        self.stdout = StreamReader(limit=limit)
+        self.stderr = StreamReader(limit=limit)
+        self.returncode: Optional[int] = None
+        self._exited = asyncio.Event()
+        self._feeder = asyncio.ensure_future(self._feed(record, speed))
+
+    async def _feed(self, record: Dict[str, Any], speed: float) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        streams = {STDOUT: self.stdout, STDERR: self.stderr}
+        for t, fd, text in record["chunks"]:
+            await asyncio.sleep(start + t / speed - loop.time())
+            streams[fd].feed_data(_decode(text))
+        await asyncio.sleep(start + record["duration"] / speed - loop.time())
+        self._exit(record["exitcode"])
+
+    def _exit(self, returncode: int) -> None:
+        self.returncode = returncode
+        self.stdout.feed_eof()
+        self.stderr.feed_eof()
+        self._exited.set()
+
+    def kill(self, signal: int) -> None:
+        if self.returncode is not None:
+            raise ProcessLookupError(self.pid)
+        self._feeder.cancel()
+        self._exit(-signal)
+
+    async def wait(self) -> int:
+        await self._exited.wait()
+        assert self.returncode is not None
+        return self.returncode
+
+
+class Replayer(Backend):
+    """Backend serving commands recorded by a Recorder instead of running them.
+
+    The recorded outputs of a command are served at the times they were recorded at,
+    divided by speed, so speed=2 replays twice as fast and speed=float("inf") as fast
+    as possible. A command recorded several times is served its recordings in turn.
+    Commands which were not recorded raise a LookupError. Stdin is discarded.
+    """
+
+    def __init__(self, file: IO[str], speed: float = 1.0) -> None:
+        if speed <= 0:
+            raise ValueError(f"speed must be positive, got {speed!r}")
+        self.speed = speed
+        self.records: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for line in file:
+            record = json.loads(line)
+            self.records[record["cmd"]].append(record)
+
+    async def create(
+        self,
+        cmd: str,
+        stdin: bool,
+        env: Optional[Mapping[str, str]],
+        cwd: Optional[Union[str, PathLike]],
+        limit: int,
+        new_session: bool,
+    ) -> Any:
+        records = self.records.get(cmd)
+        if not records:
+            raise LookupError(f"No recording of {cmd!r}")
+        record = records[0]
+        records.rotate(-1)
+        return _ReplayedProcess(record, stdin, limit, self.speed)
+
+    def signal(self, process: Any, signal: int, group: bool) -> None:
+        process.kill(signal)
+
+    def close(self, process: Any) -> None:
+        pass  # Killed processes are fed an end of file
+
+
+@contextmanager
+def record(path: Union[str, PathLike]) -> Iterator[Recorder]:
+    """Records the commands spawned within the context to a gzipped file at path."""
+    with gzip.open(path, "wt", encoding="utf-8") as file:
+        recorder = Recorder(file)
+        with use_backend(recorder):
+            yield recorder
+
+
+@contextmanager
+def replay(path: Union[str, PathLike], speed: float = 1.0) -> Iterator[Replayer]:
+    """Replays the commands spawned within the context from a file written by record.
+
+    See Replayer for how commands are replayed.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        replayer = Replayer(file, speed)
+    with use_backend(replayer):
+        yield replayer
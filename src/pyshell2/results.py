@@ -0,0 +1,149 @@
+import sys
+from array import array
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+
+from pyshell2.core import ProcessInfo
+
+Output = Union[str, bytes]
+
+
+def _text(output: Output) -> str:
+    return output if isinstance(output, str) else output.decode()
+
+
+class CompactProcessInfo:
+    """Memory compact, drop-in replacement of ProcessInfo.
+
+    Outputs are kept either as interned strings, so identical outputs are shared, or as
+    bytes, which are only decoded when accessed. Like ProcessInfo, it can be unpacked
+    into, indexed as and compared to a tuple of exitcode, stdout and stderr. Like
+    ProcessInfo, it is immutable, as it is hashable.
+    """
+
+    __slots__ = ("_exitcode", "_stdout", "_stderr")
+    _exitcode: int
+    _stdout: Output
+    _stderr: Output
+
+    def __init__(self, exitcode: int, stdout: Output = "", stderr: Output = "") -> None:
+        object.__setattr__(self, "_exitcode", exitcode)
+        object.__setattr__(
+            self, "_stdout", sys.intern(stdout) if isinstance(stdout, str) else stdout
+        )
+        object.__setattr__(
+            self, "_stderr", sys.intern(stderr) if isinstance(stderr, str) else stderr
+        )
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    @property
+    def exitcode(self) -> int:
+        return self._exitcode
+
+    @property
+    def stdout(self) -> str:
+        return _text(self._stdout)
+
+    @property
+    def stderr(self) -> str:
+        return _text(self._stderr)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._astuple())
+
+    def __len__(self) -> int:
+        return 3
+
+    def __getitem__(self, index: int) -> Any:
+        return self._astuple()[index]
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (tuple, CompactProcessInfo)):
+            return self._astuple() == tuple(other)
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._astuple())
+
+    def __repr__(self) -> str:
+        return (
+            f"CompactProcessInfo(exitcode={self.exitcode!r}, "
+            f"stdout={self.stdout!r}, stderr={self.stderr!r})"
+        )
+
+    @classmethod
+    def from_process_info(
+        cls,
+        process_info: Union[ProcessInfo, "CompactProcessInfo"],
+    ) -> "CompactProcessInfo":
+        if isinstance(process_info, CompactProcessInfo):
+            return process_info
+        return cls(*process_info)
+
+    def to_process_info(self) -> ProcessInfo:
+        return ProcessInfo(*self._astuple())
+
+    def _astuple(self) -> Tuple[int, str, str]:
+        return (self.exitcode, self.stdout, self.stderr)
+
+
+class ResultSet:
+    """Columnar container of the results of many commands.
+
+    Exit codes are stored in an array and all outputs back to back in a single buffer,
+    indexed by an array of offsets. Empty outputs take no space in the buffer. Results
+    are decoded lazily, when they are accessed.
+    """
+
+    def __init__(
+        self,
+        process_infos: Iterable[Union[ProcessInfo, CompactProcessInfo]] = (),
+    ) -> None:
+        self.exitcodes = array("i")
+        self.buffer = bytearray()
+        # The stdout of result i is buffer[offsets[2i]:offsets[2i+1]] and its stderr is
+        # buffer[offsets[2i+1]:offsets[2i+2]]
+        self.offsets = array("Q", [0])
+
+        self.extend(process_infos)
+
+    def __len__(self) -> int:
+        return len(self.exitcodes)
+
+    def __getitem__(self, index: int) -> CompactProcessInfo:
+        index = range(len(self))[index]  # Supports negative indices and bounds checks
+        return CompactProcessInfo(
+            self.exitcodes[index],
+            self._output(2 * index),
+            self._output(2 * index + 1),
+        )
+
+    def __iter__(self) -> Iterator[CompactProcessInfo]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def append(self, process_info: Union[ProcessInfo, CompactProcessInfo]) -> None:
+        exitcode, stdout, stderr = process_info
+        self.exitcodes.append(exitcode)
+        for output in (stdout, stderr):
+            self.buffer += output.encode()
+            self.offsets.append(len(self.buffer))
+
+    def extend(
+        self,
+        process_infos: Iterable[Union[ProcessInfo, CompactProcessInfo]],
+    ) -> None:
+        for process_info in process_infos:
+            self.append(process_info)
+
+    def failed(self) -> List[int]:
+        """Returns the indices of the results with a non-zero exit code."""
+        return [i for i, exitcode in enumerate(self.exitcodes) if exitcode != 0]
+
+    def _output(self, i: int) -> bytes:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return bytes(memoryview(self.buffer)[start:end])
@@ -1,13 +1,34 @@
-import asyncio
-from typing import List
+from __future__ import annotations
 
-from . import asyncshell
-from .asyncshell import (
+from os import PathLike
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterable,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Union,
+)
+
+from .core import (
     DEFAULT_CHECK_EXITCODE,
+    DEFAULT_RETAIN_OUTPUT,
     DEFAULT_STDERR_LOG_LEVEL,
     DEFAULT_STDOUT_LOG_LEVEL,
+    DEFAULT_STREAM_LIMIT,
+    OutputCallback,
     ProcessInfo,
+    join_args,
 )
+from .env import resolve_env
+from .outputlog import OutputLog
+from .parsers import Parser
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from .singleflight import SingleFlight
 
 
 def sh(
@@ -15,9 +36,26 @@ def sh(
     stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
     stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
     check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    stdout_parser: Optional[Parser] = None,
+    stderr_parser: Optional[Parser] = None,
+    retain_output: bool = DEFAULT_RETAIN_OUTPUT,
+    output_log: Optional[OutputLog] = None,
+    env: Optional[Mapping[str, str]] = None,
+    env_overlay: Optional[Mapping[str, str]] = None,
+    cwd: Optional[Union[str, PathLike]] = None,
+    stdout_callback: Optional[OutputCallback] = None,
+    stderr_callback: Optional[OutputCallback] = None,
+    limit: int = DEFAULT_STREAM_LIMIT,
+    input: Optional[Union[bytes, Iterable[bytes], AsyncIterable[bytes]]] = None,
+    executor: Optional[Executor] = None,
+    single_flight: Union[bool, SingleFlight] = False,
+    new_session: bool = False,
 ) -> ProcessInfo:
     """Runs a shell command.
 
+    If sh fails or is cancelled before the command has exited, e.g. because a parser or
+    callback raised, the command is killed.
+
     Args:
         args: Command arguments to run. Arguments containing spaces will be wrapped in
             quotes.
@@ -25,17 +63,149 @@ def sh(
         stderr_log_level: Log level of the stderr of the shell command.
         check_exitcode: Whether to check if the exit code is zero or not. If true and
             exitcode is non-zero, a CalledProcessError will be raised.
+        stdout_parser: Parser fed with every line of stdout as it is read.
+        stderr_parser: Parser fed with every line of stderr as it is read.
+        retain_output: Whether to retain the stdout and stderr of the shell command. If
+            false, the returned stdout and stderr are empty, which saves memory when
+            the output is only consumed through parsers.
+        output_log: Log to which the stdout and stderr are appended, interleaved in the
+            order they are read.
+        env: Environment variables of the shell command. If None, the environment of
+            the current process is inherited.
+        env_overlay: Environment variables overriding those of env. The overlay is
+            merged into a new dict on every call, unless both env and env_overlay are
+            FrozenEnvs, whose overlays are cached.
+        cwd: Working directory of the shell command. If None, the working directory of
+            the current process is inherited.
+        stdout_callback: Coroutine function awaited with every line of stdout as it is
+            read, e.g. the put method of a bounded asyncio.Queue. No more output is read
+            until it returns, so a slow callback pauses the command once the pipe
+            buffers are full, rather than buffering its output unboundedly.
+        stderr_callback: Like stdout_callback, but for the lines of stderr.
+        limit: Buffer limit of the stdout and stderr readers, in bytes. Lines longer
+            than this raise a ValueError.
+        input: Data written to the stdin of the shell command, either as bytes or as an
+            iterable or async iterable of chunks, which are written one at a time as the
+            command reads them. If None, the stdin of the current process is inherited.
+        executor: Executor to hand the parsing and logging of the output lines to, so
+            that they do not block the event loop. The output is then processed once
+            the command has exited, and the output callbacks cannot be used. With a
+            ProcessPoolExecutor, parsers are pickled without their callback, their
+            records are delivered in the current process and outputs of at least 1 MiB
+            are passed through shared memory. Note that worker processes log with their
+            own logging configuration, which forked workers inherit.
+        single_flight: Whether to collapse the call with an identical call which is
+            already running, awaiting its result instead of running the command again.
+            Calls are identical if their args, env, env_overlay, cwd, input and the
+            other arguments affecting the result are. Either true to collapse calls in
+            DEFAULT_SINGLE_FLIGHT, or the SingleFlight group to collapse calls in.
+            Calls with parsers, callbacks, an output log or an iterable input cannot
+            be collapsed.
+        new_session: Whether to run the command in a new session, so that its whole
+            process group is killed rather than only the shell. The command then has
+            no controlling terminal, e.g. for password prompts.
     Returns:
         A ProcessInfo containing the exitcode, stdout, and stderr from the command.
     Raises:
         CalledProcessError: If the shell command exited with a non-zero exitcode and
             check_exitcode is true.
+        ValueError: If both an executor and output callbacks are given, or if
+            single_flight is set for a call which cannot be collapsed.
     """
+    import asyncio
+
+    from . import asyncshell
+
     return asyncio.run(
         asyncshell.sh(
             args=args,
             stdout_log_level=stdout_log_level,
             stderr_log_level=stderr_log_level,
             check_exitcode=check_exitcode,
+            stdout_parser=stdout_parser,
+            stderr_parser=stderr_parser,
+            retain_output=retain_output,
+            output_log=output_log,
+            env=env,
+            env_overlay=env_overlay,
+            cwd=cwd,
+            stdout_callback=stdout_callback,
+            stderr_callback=stderr_callback,
+            limit=limit,
+            input=input,
+            executor=executor,
+            single_flight=single_flight,
+            new_session=new_session,
         )
     )
+
+
+def sh_direct(
+    args: List[str],
+    stdout_log_level: int = DEFAULT_STDOUT_LOG_LEVEL,
+    stderr_log_level: int = DEFAULT_STDERR_LOG_LEVEL,
+    check_exitcode: bool = DEFAULT_CHECK_EXITCODE,
+    env: Optional[Mapping[str, str]] = None,
+    env_overlay: Optional[Mapping[str, str]] = None,
+    cwd: Optional[Union[str, PathLike]] = None,
+) -> ProcessInfo:
+    """Runs a shell command directly, without an event loop.
+
+    This is a trimmed down version of sh for short lived programs running a few
+    commands, where setting up an event loop is a large share of the runtime. The output
+    is logged once the command has exited, stdout first and then stderr. As it does not
+    spawn the command, the command is not run with the backend set by use_backend, e.g.
+    it is not recorded nor replayed.
+
+    Args:
+        args: Command arguments to run. Arguments containing spaces will be wrapped in
+            quotes.
+        stdout_log_level: Log level of the stdout of the shell command.
+        stderr_log_level: Log level of the stderr of the shell command.
+        check_exitcode: Whether to check if the exit code is zero or not. If true and
+            exitcode is non-zero, a CalledProcessError will be raised.
+        env: Environment variables of the shell command. If None, the environment of
+            the current process is inherited.
+        env_overlay: Environment variables overriding those of env.
+        cwd: Working directory of the shell command. If None, the working directory of
+            the current process is inherited.
+    Returns:
+        A ProcessInfo containing the exitcode, stdout, and stderr from the command.
+    Raises:
+        CalledProcessError: If the shell command exited with a non-zero exitcode and
+            check_exitcode is true.
+    """
+    import subprocess
+
+    cmd = join_args(args)
+
+    process = subprocess.run(
+        cmd,
+        shell=True,
+        capture_output=True,
+        env=resolve_env(env, env_overlay),
+        cwd=cwd,
+        close_fds=False,  # Allows subprocess to spawn with posix_spawn
+    )
+
+    stdout = _log_output(process.stdout, stdout_log_level)
+    stderr = _log_output(process.stderr, stderr_log_level)
+
+    if check_exitcode and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+
+    return ProcessInfo(process.returncode, stdout, stderr)
+
+
+def _log_output(bdata: bytes, loglevel: int) -> str:
+    lines = bdata.decode().split("\n")
+    if lines[-1] == "":
+        lines.pop()  # Remove trailing newline
+
+    if lines:
+        import logging
+
+        for line in lines:
+            logging.log(loglevel, line)
+
+    return "\n".join(lines)
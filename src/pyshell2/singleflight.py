@@ -0,0 +1,73 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Group of calls in which concurrent calls with the same key are collapsed.
+
+    While a call is running, later calls with the same key await its result instead of
+    running again. Only calls on the same event loop are collapsed. The shared call is
+    cancelled once all callers awaiting it are cancelled.
+
+    Attributes:
+        calls: Number of calls made.
+        collapsed: Number of calls which awaited the result of another call.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.collapsed = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"SingleFlight(calls={self.calls!r}, collapsed={self.collapsed!r}, "
+            f"in_flight={self.in_flight!r})"
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently running."""
+        return len(self._flights)
+
+    async def run(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Awaits fn(), or the result of the running call with the same key if any."""
+        key = (asyncio.get_running_loop(), key)
+        self.calls += 1
+
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda _: self._land(key, flight))
+        else:
+            self.collapsed += 1
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Every caller was cancelled, so is the call, e.g. killing its command.
+                # Later callers start a new call rather than joining the dying one.
+                self._land(key, flight)
+                flight.task.cancel()
+                await asyncio.wait({flight.task})
+
+    def _land(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+
+# Group of the calls made with single_flight=True
+DEFAULT_SINGLE_FLIGHT = SingleFlight()
@@ -0,0 +1,118 @@
+import json
+import time
+from typing import Any, Dict, Iterator, List
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from pyshell2 import asyncdocker
+from pyshell2.asyncdocker import CACHE_LABEL, docker_run, ensure_cache, prune_caches
+from pyshell2.asyncshell import ProcessInfo
+
+
+@pytest.fixture(autouse=True)
+def caches() -> Iterator[None]:
+    asyncdocker._caches.clear()
+    yield
+    asyncdocker._caches.clear()
+
+
+def docker_mock(volumes: Dict[str, Dict[str, Any]]) -> Any:
+    """Returns a fake of sh for docker volume commands of volumes by name."""
+
+    async def sh(args: List[str], **kwargs: Any) -> ProcessInfo:
+        if args[1:3] == ["volume", "ls"]:
+            return ProcessInfo(0, "\n".join(volumes), "")
+        if args[1:3] == ["volume", "inspect"]:
+            return ProcessInfo(0, json.dumps([volumes[name] for name in args[3:]]), "")
+        if args[1:3] == ["system", "df"]:
+            return ProcessInfo(0, json.dumps(list(volumes.values())), "")
+        if args[1:3] == ["volume", "rm"]:
+            return ProcessInfo(0 if args[3] != "in-use" else 1, "", "")
+        return ProcessInfo(0, "", "")
+
+    return sh
+
+
+def volume(name: str, age: float, size: str) -> Dict[str, Any]:
+    created = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(time.time() - age))
+    return {"Name": name, "CreatedAt": created, "Size": size}
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_ensure_cache_once(sh_mock: MagicMock) -> None:
+    # Act
+    names = [await ensure_cache("pip"), await ensure_cache("pip")]
+
+    # Assert
+    assert names == ["pip", "pip"]
+    assert sh_mock.call_args_list == [
+        call(
+            ["docker", "volume", "create", "--label", CACHE_LABEL, "pip"],
+            stdout_log_level=asyncdocker.DEBUG,
+        )
+    ]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_docker_run_ensures_caches(sh_mock: MagicMock) -> None:
+    # Act
+    await docker_run("pyshell2/pip", ["install"], caches={"pip": "/root/.cache/pip"})
+
+    # Assert
+    assert [c.args[0][:3] for c in sh_mock.call_args_list[:1]] == [
+        ["docker", "volume", "create"]
+    ]
+    assert (
+        "type=volume,src=pip,dst=/root/.cache/pip" in sh_mock.call_args.kwargs["args"]
+    )
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_prune_by_age(sh_mock: MagicMock) -> None:
+    # Arrange
+    sh_mock.side_effect = docker_mock(
+        {
+            "new": volume("new", 60, "1kB"),
+            "old": volume("old", 7200, "1kB"),
+            "in-use": volume("in-use", 7200, "1kB"),
+        }
+    )
+
+    # Act
+    removed = await prune_caches(max_age=3600)
+
+    # Assert
+    assert removed == ["old"]
+
+
+@pytest.mark.parametrize(
+    "in_use, expected",
+    [
+        ([], ["c", "b"]),
+        # The oldest cache cannot be removed, so newer ones are removed instead
+        ([volume("in-use", 240, "1MB")], ["c", "b", "a"]),
+    ],
+)
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_prune_by_size(
+    sh_mock: MagicMock, in_use: List[Dict[str, Any]], expected: List[str]
+) -> None:
+    # Arrange
+    volumes = [
+        volume("a", 60, "1.5MB"),
+        volume("b", 120, "2MB"),
+        volume("c", 180, "1MB"),
+        *in_use,
+    ]
+    sh_mock.side_effect = docker_mock({spec["Name"]: spec for spec in volumes})
+
+    # Act
+    removed = await prune_caches(max_size=2 * 10**6)
+
+    # Assert
+    assert removed == expected
@@ -0,0 +1,100 @@
+from logging import DEBUG
+from typing import Any, AsyncIterator, Callable, List
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from pyshell2.asyncdocker import Container
+from pyshell2.asyncshell import ProcessInfo
+
+
+def lines_of(lines: List[str]) -> Callable[..., AsyncIterator[str]]:
+    async def sh_lines(*args: Any, **kwargs: Any) -> AsyncIterator[str]:
+        for line in lines:
+            yield line
+
+    return sh_lines
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh_lines")
+async def test_logs(sh_lines_mock: MagicMock) -> None:
+    # Arrange
+    sh_lines_mock.side_effect = lines_of(["Hello", "World!"])
+
+    # Act
+    lines = [line async for line in Container("c0ffee").logs(log_level=-1)]
+
+    # Assert
+    assert lines == ["Hello", "World!"]
+    assert sh_lines_mock.call_args_list == [
+        call(["docker", "logs", "--follow=true", "c0ffee", "2>&1"], stdout_log_level=-1)
+    ]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh_lines")
+async def test_stats(sh_lines_mock: MagicMock) -> None:
+    # Arrange
+    sh_lines_mock.side_effect = lines_of(
+        ['\x1b[2J\x1b[H{"CPUPerc": "0.00%"}', "", '{"CPUPerc": "1.00%"}']
+    )
+
+    # Act
+    stats = [sample async for sample in Container("c0ffee").stats()]
+
+    # Assert
+    assert stats == [{"CPUPerc": "0.00%"}, {"CPUPerc": "1.00%"}]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_wait(sh_mock: MagicMock) -> None:
+    # Arrange
+    sh_mock.return_value = ProcessInfo(0, "137", "")
+
+    # Act
+    exitcode = await Container("c0ffee").wait()
+
+    # Assert
+    assert exitcode == 137
+    assert sh_mock.call_args_list == [
+        call(["docker", "wait", "c0ffee"], stdout_log_level=DEBUG)
+    ]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_stop_and_kill(sh_mock: MagicMock) -> None:
+    # Arrange
+    container = Container("c0ffee")
+
+    # Act
+    await container.stop(timeout=3)
+    await container.kill(signal="SIGTERM")
+
+    # Assert
+    assert sh_mock.call_args_list == [
+        call(["docker", "stop", "--time", "3", "c0ffee"], stdout_log_level=DEBUG),
+        call(
+            ["docker", "kill", "--signal", "SIGTERM", "c0ffee"], stdout_log_level=DEBUG
+        ),
+    ]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_removed_on_exit(sh_mock: MagicMock) -> None:
+    # Act
+    with pytest.raises(RuntimeError):
+        async with Container("c0ffee"):
+            raise RuntimeError()
+
+    # Assert
+    assert sh_mock.call_args_list == [
+        call(
+            ["docker", "rm", "--force", "c0ffee"],
+            stdout_log_level=DEBUG,
+            check_exitcode=False,
+        )
+    ]
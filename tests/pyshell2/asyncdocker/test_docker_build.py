@@ -0,0 +1,160 @@
+import io
+import os
+import tarfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from pyshell2.asyncdocker import DockerBuild, docker_build, docker_build_all
+from pyshell2.asyncshell import ProcessInfo
+
+from .test_docker_run import SHELL_VALUES, fake_docker
+
+
+def build_mock(image_ids: Dict[str, str]) -> Tuple[AsyncMock, List[bytes]]:
+    """Mocks sh running docker build, writing the image ID of the tag to the iidfile.
+
+    Returns the mock and the list to which the streamed archives are appended.
+    """
+    archives: List[bytes] = []
+
+    async def sh(args: List[str], **kwargs: Any) -> ProcessInfo:
+        archives.append(b"".join([chunk async for chunk in kwargs["input"]]))
+        iidfile = args[args.index("--iidfile") + 1]
+        tag = args[args.index("--tag") + 1] if "--tag" in args else None
+        Path(iidfile).write_text(f"{image_ids[str(tag)]}\n")
+        return ProcessInfo(0, "", "")
+
+    return AsyncMock(side_effect=sh), archives
+
+
+def archive_names(archive: bytes) -> List[str]:
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        return sorted(tar.getnames())
+
+
+@pytest.mark.asyncio
+async def test_docker_build() -> None:
+    # Arrange
+    sh_mock, archives = build_mock({"pyshell2/echo": "sha256:c0ffee"})
+    context = {"Dockerfile": b"FROM alpine\n", "bin/echo.sh": b"echo $@\n"}
+
+    # Act
+    with patch("pyshell2.asyncdocker.sh", sh_mock):
+        image_id = await docker_build(
+            context,
+            tag="pyshell2/echo",
+            dockerfile="Dockerfile",
+            build_args={"GREETING": "Hello World!"},
+        )
+
+    # Assert
+    assert image_id == "sha256:c0ffee"
+    args = sh_mock.call_args.kwargs["args"]
+    assert args[:3] == ["docker", "build", "--iidfile"]
+    assert args[4:] == [
+        "--tag",
+        "pyshell2/echo",
+        "--file",
+        "Dockerfile",
+        "--build-arg",
+        "GREETING=Hello World!",
+        "-",
+    ]
+    assert [archive_names(archive) for archive in archives] == [
+        ["Dockerfile", "bin/echo.sh"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_docker_build_directory(tmp_path: Path) -> None:
+    # Arrange
+    sh_mock, archives = build_mock({"None": "sha256:c0ffee"})
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "bin" / "echo.sh").write_text("echo $@\n")
+    (tmp_path / "Dockerfile").write_text("FROM alpine\n")
+
+    # Act
+    with patch("pyshell2.asyncdocker.sh", sh_mock):
+        await docker_build(tmp_path)
+
+    # Assert
+    assert [archive_names(archive) for archive in archives] == [
+        [".", "Dockerfile", "bin", "bin/echo.sh"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_docker_build_large_file(tmp_path: Path) -> None:
+    # Arrange
+    chunks: List[bytes] = []
+
+    async def sh(args: List[str], **kwargs: Any) -> ProcessInfo:
+        chunks.extend([chunk async for chunk in kwargs["input"]])
+        Path(args[args.index("--iidfile") + 1]).write_text("sha256:c0ffee")
+        return ProcessInfo(0, "", "")
+
+    data = os.urandom(300_001)
+    (tmp_path / ".dockerignore").write_bytes(data)
+
+    # Act
+    with patch("pyshell2.asyncdocker.sh", AsyncMock(side_effect=sh)):
+        await docker_build(tmp_path)
+
+    # Assert
+    assert max(map(len, chunks)) <= 2**16
+    with tarfile.open(fileobj=io.BytesIO(b"".join(chunks))) as tar:
+        assert tar.getnames() == [".", ".dockerignore"]
+        file = tar.extractfile(".dockerignore")
+        assert file is not None and file.read() == data
+
+
+@pytest.mark.asyncio
+async def test_docker_build_all() -> None:
+    # Arrange
+    image_ids = {"pyshell2/echo": "sha256:0", "pyshell2/cat": "sha256:1"}
+    sh_mock, _ = build_mock(image_ids)
+
+    # Act
+    with patch("pyshell2.asyncdocker.sh", sh_mock):
+        built = await docker_build_all(
+            {
+                "pyshell2/echo": DockerBuild({"Dockerfile": b"FROM alpine\n"}),
+                "pyshell2/cat": DockerBuild(
+                    {"cat.Dockerfile": b"FROM alpine\n"},
+                    dockerfile="cat.Dockerfile",
+                    build_args={"A": "0"},
+                ),
+            },
+            max_concurrency=1,
+        )
+
+    # Assert
+    assert built == image_ids
+    assert sh_mock.call_args.kwargs["args"][-5:] == [
+        "--file",
+        "cat.Dockerfile",
+        "--build-arg",
+        "A=0",
+        "-",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_build_args_taken_literally(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Arrange
+    args_file = fake_docker(tmp_path, monkeypatch)
+
+    # Act
+    image_id = await docker_build({"Dockerfile": b""}, build_args=SHELL_VALUES)
+
+    # Assert
+    assert image_id == "sha256:c0ffee"
+    args = args_file.read_text().splitlines()
+    assert [args[i + 1] for i, arg in enumerate(args) if arg == "--build-arg"] == [
+        f"{key}={value}" for key, value in SHELL_VALUES.items()
+    ]
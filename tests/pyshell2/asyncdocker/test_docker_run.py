@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from typing import Any, Dict
 from unittest.mock import MagicMock, call, patch
@@ -38,6 +39,7 @@ EQ = '\\"'  # Esacped quote
                 "stdout_log_level": 9000,
                 "stderr_log_level": -9000,
                 "check_exitcode": False,
+                "single_flight": False,
             },
         ),
         (
@@ -64,6 +66,7 @@ EQ = '\\"'  # Esacped quote
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "single_flight": False,
             },
         ),
         (
@@ -86,6 +89,7 @@ EQ = '\\"'  # Esacped quote
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "single_flight": False,
             },
         ),
         (
@@ -116,6 +120,7 @@ EQ = '\\"'  # Esacped quote
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "single_flight": False,
             },
         ),
         (
@@ -156,6 +161,37 @@ EQ = '\\"'  # Esacped quote
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "single_flight": False,
+            },
+        ),
+        (
+            {
+                "image": "pyshell2/env",
+                "args": [],
+                "env": {"GREETING": "Hello World!", "NAME": "pyshell2"},
+                "env_file": Path("greeting.env"),
+                "workdir": "/mnt",
+            },
+            {
+                "args": [
+                    "docker",
+                    "run",
+                    "-d=false",
+                    "--rm=true",
+                    "--env",
+                    "GREETING=Hello World!",
+                    "--env",
+                    "NAME=pyshell2",
+                    "--env-file",
+                    "greeting.env",
+                    "--workdir",
+                    "/mnt",
+                    "pyshell2/env",
+                ],
+                "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
+                "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
+                "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "single_flight": False,
             },
         ),
     ],
@@ -193,3 +229,42 @@ async def test_return_value(
 
     # Assert
     assert process_info == ProcessInfo(9000, "Hello World!", "ERROR")
+
+
+# Values which the shell would expand, or fail to parse, if they were not quoted
+SHELL_VALUES = {"PRICE": "$5", "Q": "it's", "CMD": "a; b", "S": 'a "b" $c `d` \\e'}
+
+
+def fake_docker(directory: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Puts a fake docker first on the PATH, writing its arguments, one per line, to
+    the returned file, and the image ID sha256:c0ffee to any --iidfile."""
+    args_file = directory / "args"
+    docker = directory / "docker"
+    docker.write_text(
+        "#!/bin/sh\n"
+        f"printf '%s\\n' \"$@\" > {args_file}\n"
+        "while [ $# -gt 0 ]; do\n"
+        '  [ "$1" = --iidfile ] && echo sha256:c0ffee > "$2"\n'
+        "  shift\n"
+        "done\n"
+    )
+    docker.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{directory}:{os.environ['PATH']}")
+    return args_file
+
+
+@pytest.mark.asyncio
+async def test_env_values_taken_literally(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Arrange
+    args_file = fake_docker(tmp_path, monkeypatch)
+
+    # Act
+    await docker_run("pyshell2/env", [], env=SHELL_VALUES)
+
+    # Assert
+    args = args_file.read_text().splitlines()
+    assert [args[i + 1] for i, arg in enumerate(args) if arg == "--env"] == [
+        f"{key}={value}" for key, value in SHELL_VALUES.items()
+    ]
@@ -0,0 +1,113 @@
+import asyncio
+from subprocess import CalledProcessError
+from typing import List
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from pyshell2.asyncdocker import docker_run_plans
+from pyshell2.asyncshell import (
+    DEFAULT_CHECK_EXITCODE,
+    DEFAULT_STDERR_LOG_LEVEL,
+    DEFAULT_STDOUT_LOG_LEVEL,
+    ProcessInfo,
+)
+from pyshell2.dockerplan import DockerRunPlan
+from pyshell2.results import ResultSet
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_sh_called(sh_mock: MagicMock) -> None:
+    # Arrange
+    sh_mock.side_effect = lambda args, **kwargs: ProcessInfo(0, args[-1], "")
+    plan = DockerRunPlan.create("pyshell2/echo")
+
+    # Act
+    process_infos = await docker_run_plans(
+        [plan.with_args(["0"]), plan.with_args(["1"])]
+    )
+
+    # Assert
+    assert process_infos == [ProcessInfo(0, "0", ""), ProcessInfo(0, "1", "")]
+    assert sh_mock.call_args_list == [
+        call(
+            args=["docker", "run", "-d=false", "--rm=true", "pyshell2/echo", arg],
+            stdout_log_level=DEFAULT_STDOUT_LOG_LEVEL,
+            stderr_log_level=DEFAULT_STDERR_LOG_LEVEL,
+            check_exitcode=DEFAULT_CHECK_EXITCODE,
+        )
+        for arg in ["0", "1"]
+    ]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_as_result_set(sh_mock: MagicMock) -> None:
+    # Arrange
+    sh_mock.side_effect = lambda args, **kwargs: ProcessInfo(0, args[-1], "")
+    plan = DockerRunPlan.create("pyshell2/echo")
+
+    # Act
+    process_infos = await docker_run_plans(
+        [plan.with_args(["0"]), plan.with_args(["1"])], as_result_set=True
+    )
+
+    # Assert
+    assert isinstance(process_infos, ResultSet)
+    assert list(process_infos) == [ProcessInfo(0, "0", ""), ProcessInfo(0, "1", "")]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_max_concurrency(sh_mock: MagicMock) -> None:
+    # Arrange
+    running = 0
+    max_running = 0
+
+    async def sh(**kwargs: object) -> ProcessInfo:
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0)
+        running -= 1
+        return ProcessInfo(0, "", "")
+
+    sh_mock.side_effect = sh
+    plan = DockerRunPlan.create("pyshell2/echo")
+
+    # Act
+    await docker_run_plans([plan] * 10, max_concurrency=3)
+
+    # Assert
+    assert max_running == 3
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_others_cancelled_on_failure(sh_mock: MagicMock) -> None:
+    # Arrange
+    cancelled: List[str] = []
+
+    async def sh(args: List[str], **kwargs: object) -> ProcessInfo:
+        if args[-1] == "fail":
+            raise CalledProcessError(1, args)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(args[-1])
+            raise
+        return ProcessInfo(0, "", "")
+
+    sh_mock.side_effect = sh
+    plan = DockerRunPlan.create("pyshell2/echo")
+
+    # Act
+    with pytest.raises(CalledProcessError):
+        await docker_run_plans(
+            [plan.with_args([arg]) for arg in ["0", "1", "fail", "3"]],
+            max_concurrency=3,
+        )
+
+    # Assert
+    assert sorted(cancelled) == ["0", "1", "3"]
@@ -1,5 +1,8 @@
+import io
+import os
+import tarfile
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, AsyncIterable, Dict, List, Optional
 from unittest.mock import MagicMock, call, patch
 
 import pytest
@@ -36,6 +39,12 @@ from pyshell2.asyncshell import (
                 "stdout_log_level": 9000,
                 "stderr_log_level": -9000,
                 "check_exitcode": False,
+                "env": None,
+                "env_file": None,
+                "workdir": None,
+                "tmpfs": None,
+                "caches": None,
+                "single_flight": False,
             },
         ),
         (
@@ -55,6 +64,12 @@ from pyshell2.asyncshell import (
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "env": None,
+                "env_file": None,
+                "workdir": None,
+                "tmpfs": None,
+                "caches": None,
+                "single_flight": False,
             },
         ),
         (
@@ -74,6 +89,12 @@ from pyshell2.asyncshell import (
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "env": None,
+                "env_file": None,
+                "workdir": None,
+                "tmpfs": None,
+                "caches": None,
+                "single_flight": False,
             },
         ),
         (
@@ -96,6 +117,12 @@ from pyshell2.asyncshell import (
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "env": None,
+                "env_file": None,
+                "workdir": None,
+                "tmpfs": None,
+                "caches": None,
+                "single_flight": False,
             },
         ),
         (
@@ -117,6 +144,12 @@ from pyshell2.asyncshell import (
                 "stdout_log_level": DEFAULT_STDOUT_LOG_LEVEL,
                 "stderr_log_level": DEFAULT_STDERR_LOG_LEVEL,
                 "check_exitcode": DEFAULT_CHECK_EXITCODE,
+                "env": None,
+                "env_file": None,
+                "workdir": None,
+                "tmpfs": None,
+                "caches": None,
+                "single_flight": False,
             },
         ),
     ],
@@ -154,3 +187,84 @@ async def test_return_value(
 
     # Assert
     assert process_info == ProcessInfo(9000, "Hello World!", "ERROR")
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_transfer(sh_mock: MagicMock, tmp_path: Path) -> None:
+    # Arrange
+    (tmp_path / "in").mkdir()
+    data = os.urandom(100_000)
+    (tmp_path / "in" / "file0").write_bytes(data)
+    argvs: List[List[str]] = []
+    chunks: List[bytes] = []
+
+    async def sh(
+        args: List[str], input: Optional[AsyncIterable[bytes]] = None, **kwargs: Any
+    ) -> ProcessInfo:
+        argvs.append(args)
+        if input is not None:
+            chunks.extend([chunk async for chunk in input])
+        return ProcessInfo(0, "abc\n" if args[1] == "create" else "", "")
+
+    sh_mock.side_effect = sh
+
+    # Act
+    await docker_sh(
+        image="pyshell2/cp",
+        args=["-r", tmp_path / "in", tmp_path / "out"],
+        transfer=True,
+        outputs=[tmp_path / "out"],
+    )
+
+    # Assert
+    assert argvs == [
+        ["docker", "create", "pyshell2/cp", "-r", "/mnt/0/in", "/mnt/1/out"],
+        ["docker", "cp", "-", "abc:/"],
+        ["docker", "start", "--attach", "abc"],
+        ["docker", "cp", "abc:/mnt/1/out", tmp_path.resolve().as_posix()],
+        ["docker", "rm", "--force", "abc"],
+    ]
+    assert max(map(len, chunks)) <= 2**16
+    with tarfile.open(fileobj=io.BytesIO(b"".join(chunks))) as tar:
+        assert tar.getnames() == ["mnt/0", "mnt/0/in", "mnt/0/in/file0", "mnt/1"]
+        assert tar.getmember("mnt/1").mode == 0o777
+        file = tar.extractfile("mnt/0/in/file0")
+        assert file is not None and file.read() == data
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.sh")
+async def test_transfer_outputs_not_copied_on_failure(sh_mock: MagicMock) -> None:
+    # Arrange
+    argvs: List[List[str]] = []
+
+    async def sh(args: List[str], **kwargs: Any) -> ProcessInfo:
+        argvs.append(args)
+        return ProcessInfo(1 if args[1] == "start" else 0, "abc", "")
+
+    sh_mock.side_effect = sh
+
+    # Act
+    await docker_sh(
+        image="pyshell2/touch",
+        args=[Path("out")],
+        check_exitcode=False,
+        transfer=True,
+        outputs=[Path("out")],
+    )
+
+    # Assert
+    assert [argv[:2] for argv in argvs] == [
+        ["docker", "create"],
+        ["docker", "cp"],
+        ["docker", "start"],
+        ["docker", "rm"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_output_not_in_args() -> None:
+    # Act & Assert
+    with pytest.raises(ValueError):
+        await docker_sh(image="pyshell2/touch", args=["out"], outputs=[Path("out")])
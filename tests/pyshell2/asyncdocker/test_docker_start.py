@@ -0,0 +1,43 @@
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from pyshell2.asyncdocker import docker_start
+from pyshell2.asyncshell import (
+    DEFAULT_STDERR_LOG_LEVEL,
+    DEFAULT_STDOUT_LOG_LEVEL,
+    ProcessInfo,
+)
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncdocker.docker_run")
+async def test_docker_run_called(docker_run_mock: MagicMock) -> None:
+    # Arrange
+    docker_run_mock.return_value = ProcessInfo(0, "c0ffee\n", "")
+
+    # Act
+    container = await docker_start("pyshell2/sleep", ["infinity"])
+
+    # Assert
+    assert container.id == "c0ffee"
+    assert docker_run_mock.call_args_list == [
+        call(
+            image="pyshell2/sleep",
+            args=["infinity"],
+            detached=True,
+            cleanup=False,
+            user=None,
+            entrypoint=None,
+            volumes=None,
+            network=None,
+            stdout_log_level=DEFAULT_STDOUT_LOG_LEVEL,
+            stderr_log_level=DEFAULT_STDERR_LOG_LEVEL,
+            check_exitcode=True,
+            env=None,
+            env_file=None,
+            workdir=None,
+            tmpfs=None,
+            caches=None,
+        )
+    ]
@@ -1,12 +1,25 @@
+import asyncio
 import logging
+import os
+import signal
+import sys
 from asyncio import StreamReader, subprocess
-from subprocess import CalledProcessError
-from typing import List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from json import JSONDecodeError
+from pathlib import Path
+from subprocess import CalledProcessError, run
+from typing import Any, Iterator, List
 from unittest.mock import AsyncMock, MagicMock, call, patch
 
 import pytest
 
-from pyshell2.asyncshell import sh
+import pyshell2
+from pyshell2.asyncshell import ProcessInfo, sh
+from pyshell2.core import DEFAULT_STREAM_LIMIT
+from pyshell2.env import FrozenEnv
+from pyshell2.outputlog import STDERR, STDOUT, OutputLog
+from pyshell2.parsers import JsonLinesParser, RegexParser
+from pyshell2.singleflight import SingleFlight
 
 
 def stream(lines: List[str] = []) -> StreamReader:
@@ -30,6 +43,26 @@ def process_mock(
     return process
 
 
+@pytest.fixture
+def processes() -> Iterator[List[subprocess.Process]]:
+    """Collects the processes created by sh, which still runs them."""
+    processes: List[subprocess.Process] = []
+    create_subprocess_shell_ = subprocess.create_subprocess_shell
+
+    async def create_subprocess_shell(**kwargs: Any) -> subprocess.Process:
+        processes.append(await create_subprocess_shell_(**kwargs))
+        return processes[-1]
+
+    with patch("asyncio.subprocess.create_subprocess_shell", create_subprocess_shell):
+        yield processes
+
+
+def assert_killed(process: subprocess.Process) -> None:
+    assert process.returncode == -signal.SIGKILL
+    with pytest.raises(ProcessLookupError):
+        os.kill(process.pid, 0)
+
+
 @pytest.mark.asyncio
 @patch("asyncio.subprocess.create_subprocess_shell")
 async def test_create_subprocess_shell_called(
@@ -45,8 +78,13 @@ async def test_create_subprocess_shell_called(
     assert create_subprocess_shell.call_args_list == [
         call(
             cmd='ls -a "./folder with space in it"',
+            stdin=None,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
+            env=None,
+            cwd=None,
+            start_new_session=False,
+            limit=DEFAULT_STREAM_LIMIT,
         )
     ]
 
@@ -143,3 +181,342 @@ async def test_check_exitcode_false(
 
     # Act & Assert
     await sh(["ls", "-a"], check_exitcode=False)
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_parsers(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    stdout = ['{"file": "file0"}', '{"file": "file1"}']
+    stderr = ["file2: Permission Denied"]
+    create_subprocess_shell.return_value = process_mock(0, stdout, stderr)
+    stdout_parser = JsonLinesParser()
+    stderr_parser = RegexParser(r"^(?P<file>\S+): Permission Denied$")
+
+    # Act
+    await sh(["ls", "-a"], stdout_parser=stdout_parser, stderr_parser=stderr_parser)
+
+    # Assert
+    assert stdout_parser.records == [{"file": "file0"}, {"file": "file1"}]
+    assert stderr_parser.records == [{"file": "file2"}]
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_retain_output_false(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    stdout = ['{"file": "file0"}', '{"file": "file1"}']
+    stderr = ["file2: Permission Denied"]
+    create_subprocess_shell.return_value = process_mock(0, stdout, stderr)
+    parser = JsonLinesParser()
+
+    # Act
+    process_info = await sh(["ls", "-a"], stdout_parser=parser, retain_output=False)
+
+    # Assert
+    assert process_info == ProcessInfo(0, "", "")
+    assert parser.records == [{"file": "file0"}, {"file": "file1"}]
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_output_log(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    stdout = ["file0", "file1"]
+    stderr = ["file2: Permission Denied"]
+    create_subprocess_shell.return_value = process_mock(0, stdout, stderr)
+    output_log = OutputLog()
+
+    # Act
+    await sh(["ls", "-a"], output_log=output_log)
+
+    # Assert
+    assert output_log.text(STDOUT) == "file0\nfile1"
+    assert output_log.text(STDERR) == "file2: Permission Denied"
+    assert len(output_log) == 3
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_output_log_viewed_while_reading(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    create_subprocess_shell.return_value = process_mock(0, ["file0", "file1"])
+    output_log = OutputLog()
+    views: List[memoryview] = []
+
+    async def callback(line: str) -> None:
+        views.append(output_log.view())
+
+    # Act
+    await sh(["ls", "-a"], output_log=output_log, stdout_callback=callback)
+
+    # Assert
+    assert [bytes(view) for view in views] == [b"file0\n", b"file0\nfile1"]
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_env_and_cwd(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    create_subprocess_shell.return_value = process_mock(0)
+
+    # Act
+    await sh(["ls"], env={"A": "0", "B": "0"}, env_overlay={"B": "1"}, cwd="/tmp")
+
+    # Assert
+    assert create_subprocess_shell.call_args_list == [
+        call(
+            cmd="ls",
+            stdin=None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env={"A": "0", "B": "1"},
+            cwd="/tmp",
+            start_new_session=False,
+            limit=DEFAULT_STREAM_LIMIT,
+        )
+    ]
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_frozen_env_shared(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    create_subprocess_shell.return_value = process_mock(0)
+    env = FrozenEnv({"A": "0"})
+    env_overlay = FrozenEnv({"B": "1"})
+
+    # Act
+    await sh(["ls"], env=env)
+    await sh(["ls"], env=env, env_overlay=env_overlay)
+    await sh(["ls"], env=env, env_overlay=env_overlay)
+
+    # Assert
+    envs = [c.kwargs["env"] for c in create_subprocess_shell.call_args_list]
+    assert envs[0] is env
+    assert envs[1] is envs[2]
+    assert envs[1] == {"A": "0", "B": "1"}
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_callbacks(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    stdout = ["file0", "file1", "file2"]
+    stderr = ["file3: Permission Denied"]
+    create_subprocess_shell.return_value = process_mock(0, stdout, stderr)
+    queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=1)
+    lines: List[str] = []
+
+    async def consume() -> None:
+        for _ in stdout:
+            lines.append(await queue.get())
+            await asyncio.sleep(0)
+
+    stderr_callback = AsyncMock()
+
+    # Act
+    await asyncio.gather(
+        sh(["ls"], stdout_callback=queue.put, stderr_callback=stderr_callback),
+        consume(),
+    )
+
+    # Assert
+    assert lines == stdout
+    assert stderr_callback.await_args_list == [call(line) for line in stderr]
+
+
+@pytest.mark.asyncio
+async def test_backpressure(processes: List[subprocess.Process]) -> None:
+    # Arrange
+    limit = 2**10
+    queue: "asyncio.Queue[str]" = asyncio.Queue(maxsize=1)
+    task = asyncio.ensure_future(
+        sh(
+            ["yes"],
+            stdout_log_level=logging.DEBUG,
+            stdout_callback=queue.put,
+            limit=limit,
+        )
+    )
+
+    # Act
+    await queue.get()
+    await asyncio.sleep(0.1)  # Let yes fill the pipe while nothing is consumed
+
+    # Assert
+    [process] = processes
+    stdout: Any = process.stdout
+    buffered = len(stdout._buffer)
+    await asyncio.sleep(0.1)
+    # The transport is paused once more than 2 * limit bytes are buffered, so the
+    # buffer no longer grows
+    assert stdout._paused
+    assert len(stdout._buffer) == buffered
+    assert queue.full()
+
+    # Act
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # Assert
+    assert_killed(process)
+
+
+@pytest.mark.asyncio
+async def test_limit(processes: List[subprocess.Process]) -> None:
+    # Act & Assert
+    await sh(["printf", "%01000d", "0"], limit=2**10)
+    with pytest.raises(ValueError):
+        await sh(["printf", "%02000d", "0;", "exec", "sleep", "7"], limit=2**10)
+    assert_killed(processes[-1])
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("new_session", [False, True])
+async def test_new_session(new_session: bool) -> None:
+    # Act
+    _, sid, _ = await sh(["ps", "-o", "sid=", "-p", "$$"], new_session=new_session)
+
+    # Assert
+    assert (int(sid) == os.getsid(0)) is not new_session
+
+
+@pytest.mark.asyncio
+async def test_input() -> None:
+    # Act
+    process_info = await sh(["cat"], input=b"Hello\nWorld!\n")
+
+    # Assert
+    assert process_info == ProcessInfo(0, "Hello\nWorld!", "")
+
+
+@pytest.mark.asyncio
+async def test_killed_when_parser_fails(processes: List[subprocess.Process]) -> None:
+    # Act
+    with pytest.raises(JSONDecodeError):
+        await sh(
+            ["echo", "warn;", "exec", "sleep", "7"],
+            stdout_parser=JsonLinesParser(),
+        )
+
+    # Assert
+    [process] = processes
+    assert_killed(process)
+
+
+@pytest.mark.asyncio
+async def test_executor() -> None:
+    # Arrange
+    records: List[Any] = []
+    parser = JsonLinesParser(callback=records.append)
+
+    # Act
+    with ThreadPoolExecutor(1) as executor:
+        process_info = await sh(
+            ["printf", '\'{"a":0}\\n{"a":1}\\n\''],
+            stdout_parser=parser,
+            executor=executor,
+        )
+
+    # Assert
+    assert process_info == ProcessInfo(0, '{"a":0}\n{"a":1}', "")
+    assert records == parser.records == [{"a": 0}, {"a": 1}]
+
+
+@pytest.mark.asyncio
+@patch("pyshell2.asyncshell.SHARED_MEMORY_SIZE", 2**10)
+async def test_process_executor_shared_memory() -> None:
+    # Arrange
+    parser = RegexParser(r"\d+")
+
+    # Act
+    with ProcessPoolExecutor(1) as executor:
+        process_info = await sh(
+            ["seq", "1000"],
+            stdout_parser=parser,
+            retain_output=False,
+            executor=executor,
+        )
+
+    # Assert
+    assert process_info == ProcessInfo(0, "", "")
+    assert parser.records == [str(i) for i in range(1, 1001)]
+
+
+SHARED_MEMORY_POOLS = """
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from pyshell2.asyncshell import sh
+
+# The workers of the second pool are forked once the resource tracker runs
+for _ in range(2):
+    with ProcessPoolExecutor(2) as executor:
+        asyncio.run(sh(["yes", "|", "head", "-c", "2700000"], executor=executor))
+"""
+
+
+def test_process_executor_shared_memory_tracked_once() -> None:
+    # Act
+    process = run(
+        [sys.executable, "-c", SHARED_MEMORY_POOLS],
+        capture_output=True,
+        check=True,
+        cwd=Path(pyshell2.__file__).parents[1],
+        text=True,
+    )
+
+    # Assert
+    assert process.stderr == ""
+
+
+@pytest.mark.asyncio
+async def test_executor_with_callbacks() -> None:
+    # Act & Assert
+    with pytest.raises(ValueError):
+        with ThreadPoolExecutor(1) as executor:
+            await sh(["ls"], stdout_callback=AsyncMock(), executor=executor)
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_single_flight(create_subprocess_shell: MagicMock) -> None:
+    # Arrange
+    create_subprocess_shell.side_effect = lambda **kwargs: process_mock(0, ["file0"])
+    group = SingleFlight()
+
+    # Act
+    process_infos = await asyncio.gather(
+        sh(["ls"], single_flight=group),
+        sh(["ls"], single_flight=group),
+        sh(["ls"], env={"A": "0"}, single_flight=group),
+        sh(["ls"]),
+    )
+
+    # Assert
+    assert process_infos == [ProcessInfo(0, "file0", "")] * 4
+    assert create_subprocess_shell.call_count == 3
+    assert (group.calls, group.collapsed) == (3, 1)
+
+
+@pytest.mark.asyncio
+async def test_single_flight_with_parser() -> None:
+    # Act & Assert
+    with pytest.raises(ValueError):
+        await sh(["ls"], stdout_parser=RegexParser("."), single_flight=True)
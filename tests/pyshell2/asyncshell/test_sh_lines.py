@@ -0,0 +1,118 @@
+import signal
+from asyncio import subprocess
+from subprocess import CalledProcessError
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from pyshell2.asyncshell import sh_lines
+from pyshell2.core import DEFAULT_STREAM_LIMIT
+
+from .test_sh import process_mock
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_create_subprocess_shell_called(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    create_subprocess_shell.return_value = process_mock(0)
+
+    # Act
+    [line async for line in sh_lines(["ls", "-a", "./folder with space in it"])]
+
+    # Assert
+    assert create_subprocess_shell.call_args_list == [
+        call(
+            cmd='ls -a "./folder with space in it"',
+            stdin=None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            env=None,
+            cwd=None,
+            start_new_session=False,
+            limit=DEFAULT_STREAM_LIMIT,
+        )
+    ]
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_lines(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    stdout = [".", "..", "folder0", "file0"]
+    create_subprocess_shell.return_value = process_mock(0, stdout=stdout)
+
+    # Act
+    lines = [line async for line in sh_lines(["ls", "-a"])]
+
+    # Assert
+    assert lines == stdout
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_check_exitcode_true(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    create_subprocess_shell.return_value = process_mock(1, stdout=["file0"])
+
+    # Act & Assert
+    with pytest.raises(CalledProcessError):
+        [line async for line in sh_lines(["ls", "-a"], check_exitcode=True)]
+
+
+@pytest.mark.asyncio
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_killed_when_stopped_early(
+    create_subprocess_shell: MagicMock,
+) -> None:
+    # Arrange
+    process = process_mock(0, stdout=["file0", "file1"])
+    process.returncode = None
+    create_subprocess_shell.return_value = process
+
+    # Act
+    lines = sh_lines(["ls", "-a"])
+    await lines.__anext__()
+    await lines.aclose()
+
+    # Assert
+    assert process.send_signal.call_args_list == [call(signal.SIGKILL)]
+
+
+@pytest.mark.asyncio
+@patch("os.killpg")
+@patch("asyncio.subprocess.create_subprocess_shell")
+async def test_process_group_killed_when_stopped_early(
+    create_subprocess_shell: MagicMock,
+    killpg: MagicMock,
+) -> None:
+    # Arrange
+    process = process_mock(0, stdout=["file0", "file1"])
+    process.returncode = None
+    create_subprocess_shell.return_value = process
+
+    # Act
+    lines = sh_lines(["ls", "-a"], new_session=True)
+    await lines.__anext__()
+    await lines.aclose()
+
+    # Assert
+    assert killpg.call_args_list == [call(process.pid, signal.SIGKILL)]
+
+
+@pytest.mark.asyncio
+async def test_limit() -> None:
+    # Act & Assert
+    with pytest.raises(ValueError):
+        [
+            line
+            async for line in sh_lines(
+                ["head", "-c", "300000", "/dev/zero"], limit=2**10
+            )
+        ]
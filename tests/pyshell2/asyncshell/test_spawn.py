@@ -0,0 +1,74 @@
+import signal
+
+import pytest
+
+from pyshell2.asyncshell import spawn
+
+
+@pytest.mark.asyncio
+async def test_interactive() -> None:
+    async with spawn(["cat"], stdin=True) as process:
+        # Act
+        await process.write(b"Hello\nWorld!")
+        hello = await process.read_until()
+        await process.close_stdin()
+        world = await process.read_until()
+        end = await process.read_until()
+
+        # Assert
+        assert (hello, world, end) == ("Hello\n", "World!", "")
+        assert await process.wait() == 0
+
+
+@pytest.mark.asyncio
+async def test_send_signal() -> None:
+    async with spawn(["exec", "sleep", "7"]) as process:
+        # Act
+        process.send_signal(signal.SIGTERM)
+
+        # Assert
+        assert await process.wait() == -signal.SIGTERM
+
+
+@pytest.mark.asyncio
+async def test_send_signal_to_process_group() -> None:
+    # sleep is not the last command, so the shell does not exec it
+    async with spawn(["sleep", "7;", "true"], new_session=True) as process:
+        # Act
+        process.send_signal(signal.SIGTERM)
+
+        # Assert
+        assert await process.wait() == -signal.SIGTERM
+
+
+@pytest.mark.asyncio
+async def test_stats() -> None:
+    # The stats are those of the shell, which does not exec sleep as it is not last
+    async with spawn(["sleep", "7;", "true"], new_session=True) as process:
+        # Act
+        stats = process.stats()
+
+    # Assert
+    assert stats.rss > 0
+    assert stats.threads == 1
+    assert stats.user_time >= 0 and stats.system_time >= 0
+    with pytest.raises(ProcessLookupError):
+        process.stats()
+
+
+@pytest.mark.asyncio
+async def test_killed_on_exit() -> None:
+    # Act
+    async with spawn(["exec", "sleep", "7"]) as process:
+        pass
+
+    # Assert
+    assert process.returncode == -signal.SIGKILL
+
+
+@pytest.mark.asyncio
+async def test_write_without_stdin() -> None:
+    async with spawn(["true"]) as process:
+        # Act & Assert
+        with pytest.raises(ValueError):
+            await process.write(b"Hello")
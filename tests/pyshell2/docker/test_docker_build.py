@@ -0,0 +1,43 @@
+import inspect
+from typing import Any, Dict
+from unittest.mock import MagicMock, call, patch
+
+from pyshell2 import asyncdocker
+from pyshell2.docker import docker_build
+
+
+def test_signature() -> None:
+    assert inspect.signature(docker_build) == inspect.signature(
+        asyncdocker.docker_build
+    )
+
+
+def test_docstring() -> None:
+    assert inspect.getdoc(docker_build) == inspect.getdoc(asyncdocker.docker_build)
+
+
+@patch("pyshell2.asyncdocker.docker_build")
+def test_kwargs(asyncdocker_mock: MagicMock) -> None:
+    # Arrange
+    signature = inspect.signature(docker_build)
+    params: Dict[str, Any] = {
+        param: index for index, param in enumerate(signature.parameters)
+    }
+
+    # Act
+    docker_build(**params)
+
+    # Assert
+    assert asyncdocker_mock.call_args_list == [call(**params)]
+
+
+@patch("pyshell2.asyncdocker.docker_build")
+def test_return_value(asyncdocker_mock: MagicMock) -> None:
+    # Arrange
+    asyncdocker_mock.return_value = "sha256:c0ffee"
+
+    # Act
+    image_id = docker_build({})
+
+    # Assert
+    assert image_id == "sha256:c0ffee"
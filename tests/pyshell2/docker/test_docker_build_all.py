@@ -0,0 +1,33 @@
+import inspect
+from typing import Any, Dict
+from unittest.mock import MagicMock, call, patch
+
+from pyshell2 import asyncdocker
+from pyshell2.docker import docker_build_all
+
+
+def test_signature() -> None:
+    assert inspect.signature(docker_build_all) == inspect.signature(
+        asyncdocker.docker_build_all
+    )
+
+
+def test_docstring() -> None:
+    assert inspect.getdoc(docker_build_all) == inspect.getdoc(
+        asyncdocker.docker_build_all
+    )
+
+
+@patch("pyshell2.asyncdocker.docker_build_all")
+def test_kwargs(asyncdocker_mock: MagicMock) -> None:
+    # Arrange
+    signature = inspect.signature(docker_build_all)
+    params: Dict[str, Any] = {
+        param: index for index, param in enumerate(signature.parameters)
+    }
+
+    # Act
+    docker_build_all(**params)
+
+    # Assert
+    assert asyncdocker_mock.call_args_list == [call(**params)]
@@ -0,0 +1,46 @@
+import inspect
+from typing import Any, Dict
+from unittest.mock import MagicMock, call, patch
+
+from pyshell2 import asyncdocker
+from pyshell2.docker import docker_run_plans
+from pyshell2.shell import ProcessInfo
+
+
+def test_signature() -> None:
+    assert inspect.signature(docker_run_plans) == inspect.signature(
+        asyncdocker.docker_run_plans
+    )
+
+
+def test_docstring() -> None:
+    assert inspect.getdoc(docker_run_plans) == inspect.getdoc(
+        asyncdocker.docker_run_plans
+    )
+
+
+@patch("pyshell2.asyncdocker.docker_run_plans")
+def test_kwargs(asyncdocker_mock: MagicMock) -> None:
+    # Arrange
+    signature = inspect.signature(docker_run_plans)
+    params: Dict[str, Any] = {
+        param: index for index, param in enumerate(signature.parameters)
+    }
+
+    # Act
+    docker_run_plans(**params)
+
+    # Assert
+    assert asyncdocker_mock.call_args_list == [call(**params)]
+
+
+@patch("pyshell2.asyncdocker.docker_run_plans")
+def test_return_value(asyncdocker_mock: MagicMock) -> None:
+    # Arrange
+    asyncdocker_mock.return_value = [ProcessInfo(292, "stdout", "stderr")]
+
+    # Act
+    process_infos = docker_run_plans([])
+
+    # Assert
+    assert process_infos == [ProcessInfo(292, "stdout", "stderr")]
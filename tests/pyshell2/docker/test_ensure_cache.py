@@ -0,0 +1,31 @@
+import inspect
+from typing import Any, Dict
+from unittest.mock import MagicMock, call, patch
+
+from pyshell2 import asyncdocker
+from pyshell2.docker import ensure_cache
+
+
+def test_signature() -> None:
+    assert inspect.signature(ensure_cache) == inspect.signature(
+        asyncdocker.ensure_cache
+    )
+
+
+def test_docstring() -> None:
+    assert inspect.getdoc(ensure_cache) == inspect.getdoc(asyncdocker.ensure_cache)
+
+
+@patch("pyshell2.asyncdocker.ensure_cache")
+def test_kwargs(asyncdocker_mock: MagicMock) -> None:
+    # Arrange
+    signature = inspect.signature(ensure_cache)
+    params: Dict[str, Any] = {
+        param: index for index, param in enumerate(signature.parameters)
+    }
+
+    # Act
+    ensure_cache(**params)
+
+    # Assert
+    assert asyncdocker_mock.call_args_list == [call(**params)]
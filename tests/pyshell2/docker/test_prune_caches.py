@@ -0,0 +1,31 @@
+import inspect
+from typing import Any, Dict
+from unittest.mock import MagicMock, call, patch
+
+from pyshell2 import asyncdocker
+from pyshell2.docker import prune_caches
+
+
+def test_signature() -> None:
+    assert inspect.signature(prune_caches) == inspect.signature(
+        asyncdocker.prune_caches
+    )
+
+
+def test_docstring() -> None:
+    assert inspect.getdoc(prune_caches) == inspect.getdoc(asyncdocker.prune_caches)
+
+
+@patch("pyshell2.asyncdocker.prune_caches")
+def test_kwargs(asyncdocker_mock: MagicMock) -> None:
+    # Arrange
+    signature = inspect.signature(prune_caches)
+    params: Dict[str, Any] = {
+        param: index for index, param in enumerate(signature.parameters)
+    }
+
+    # Act
+    prune_caches(**params)
+
+    # Assert
+    assert asyncdocker_mock.call_args_list == [call(**params)]
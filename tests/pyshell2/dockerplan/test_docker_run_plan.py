@@ -0,0 +1,95 @@
+import json
+from pathlib import Path
+
+from pyshell2.dockerplan import DockerRunPlan
+
+EQ = '\\"'  # Esacped quote
+
+
+def template() -> DockerRunPlan:
+    return DockerRunPlan.create(
+        image="pyshell2/cat",
+        user="0:0",
+        entrypoint="/bin/cat",
+        volumes={Path("."): Path("/mnt/dir")},
+        network="none",
+        env={"A": "0"},
+        env_file=Path("a.env"),
+        workdir="/mnt/dir",
+        tmpfs=["/tmp"],
+        caches={"pip": "/root/.cache/pip"},
+    )
+
+
+def test_argv() -> None:
+    # Act
+    argv = template().with_args(["/mnt/dir/file0"]).argv
+
+    # Assert
+    assert argv == [
+        "docker",
+        "run",
+        "-d=false",
+        "--rm=true",
+        "--user",
+        "0:0",
+        "--entrypoint",
+        "/bin/cat",
+        "--mount",
+        f"type=bind,{EQ}src={Path('.').resolve()}{EQ},{EQ}dst=/mnt/dir{EQ}",
+        "--tmpfs",
+        "/tmp",
+        "--mount",
+        "type=volume,src=pip,dst=/root/.cache/pip",
+        "--network",
+        "none",
+        "--env",
+        "A=0",
+        "--env-file",
+        "a.env",
+        "--workdir",
+        "/mnt/dir",
+        "pyshell2/cat",
+        "/mnt/dir/file0",
+    ]
+
+
+def test_create_argv() -> None:
+    # Arrange
+    plan = template().with_args(["/mnt/dir/file0"])
+
+    # Act
+    argv = plan.create_argv
+
+    # Assert
+    assert argv == ["docker", "create", *plan.argv[4:]]
+
+
+def test_with_args() -> None:
+    # Arrange
+    plan = template()
+
+    # Act
+    plans = [plan.with_args([f"file{i}"]) for i in range(3)]
+
+    # Assert
+    assert [p.argv[-2:] for p in plans] == [
+        ["pyshell2/cat", f"file{i}"] for i in range(3)
+    ]
+    assert plan.args == ()
+
+
+def test_hashable() -> None:
+    # Act & Assert
+    assert len({template(), template(), template().with_args(["file0"])}) == 2
+
+
+def test_serializable() -> None:
+    # Arrange
+    plan = template().with_args(["file0"])
+
+    # Act
+    data = json.loads(json.dumps(plan.to_dict()))
+
+    # Assert
+    assert DockerRunPlan.from_dict(data) == plan
@@ -0,0 +1,43 @@
+import os
+from unittest.mock import patch
+
+from pyshell2.env import FrozenEnv, resolve_env
+
+
+def test_mapping() -> None:
+    # Arrange
+    env = FrozenEnv({"A": "0", "B": "1"})
+
+    # Act & Assert
+    assert env == {"A": "0", "B": "1"}
+    assert dict(env.items()) == {"A": "0", "B": "1"}
+    assert hash(env) == hash(FrozenEnv({"B": "1", "A": "0"}))
+
+
+def test_overlay_cached() -> None:
+    # Arrange
+    env = FrozenEnv({"A": "0", "B": "0"})
+    overlay = FrozenEnv({"B": "1"})
+
+    # Act
+    overlaid = env.overlay(overlay)
+
+    # Assert
+    assert overlaid == {"A": "0", "B": "1"}
+    assert env.overlay(overlay) is overlaid
+    assert env == {"A": "0", "B": "0"}
+
+
+@patch.dict(os.environ, {"A": "0"}, clear=True)
+def test_from_environ() -> None:
+    # Arrange
+    env = FrozenEnv.from_environ()
+    overlay = FrozenEnv({"B": "1"})
+
+    # Act
+    os.environ["A"] = "1"
+
+    # Assert
+    assert env == {"A": "0"}
+    assert resolve_env(env, overlay) is resolve_env(env, overlay)
+    assert resolve_env(None, overlay) == {"A": "1", "B": "1"}
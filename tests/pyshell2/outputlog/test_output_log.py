@@ -0,0 +1,66 @@
+from itertools import count
+
+from pyshell2.outputlog import STDERR, STDOUT, OutputLog
+
+
+def output_log() -> OutputLog:
+    clock = count()
+    log = OutputLog(clock=lambda: float(next(clock)))
+    log.append(STDOUT, b"out0\n")
+    log.append(STDERR, b"err0\n")
+    log.append(STDOUT, b"out1\n")
+    return log
+
+
+def test_events() -> None:
+    # Arrange
+    log = output_log()
+
+    # Act
+    events = [(e.timestamp, e.stream, e.offset, bytes(e.data)) for e in log]
+
+    # Assert
+    assert events == [
+        (0.0, STDOUT, 0, b"out0\n"),
+        (1.0, STDERR, 5, b"err0\n"),
+        (2.0, STDOUT, 10, b"out1\n"),
+    ]
+
+
+def test_chunks() -> None:
+    # Arrange
+    log = output_log()
+
+    # Act & Assert
+    assert [bytes(chunk) for chunk in log.chunks(STDOUT)] == [b"out0\n", b"out1\n"]
+    assert [bytes(chunk) for chunk in log.chunks(STDERR)] == [b"err0\n"]
+    assert len(list(log.chunks())) == len(log) == 3
+
+
+def test_text() -> None:
+    # Arrange
+    log = output_log()
+
+    # Act & Assert
+    assert log.text(STDOUT) == "out0\nout1\n"
+    assert log.text(STDERR) == "err0\n"
+    assert log.text() == "out0\nerr0\nout1\n"
+    assert log.view() == b"out0\nerr0\nout1\n"
+
+
+def test_append_while_views_held() -> None:
+    # Arrange
+    log = output_log()
+    view = log.view()
+    chunks = log.chunks()
+    first = next(chunks)
+
+    # Act
+    log.append(STDERR, b"err1\n")
+
+    # Assert
+    assert view == b"out0\nerr0\nout1\n"
+    assert first == b"out0\n"
+    assert [bytes(chunk) for chunk in chunks] == [b"err0\n", b"out1\n"]
+    assert log.text(STDERR) == "err0\nerr1\n"
+    assert log.view() == b"out0\nerr0\nout1\nerr1\n"
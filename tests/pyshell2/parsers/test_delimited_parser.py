@@ -0,0 +1,38 @@
+from typing import Any, List, Optional, Sequence
+
+import pytest
+
+from pyshell2.parsers import DelimitedParser
+
+
+@pytest.mark.parametrize(
+    "delimiter, fields, lines, records",
+    [
+        (None, None, ["a b  c", ""], [["a", "b", "c"]]),
+        (",", None, ["a,b,,c"], [["a", "b", "", "c"]]),
+        (
+            ":",
+            ["user", "uid"],
+            ["root:0", "me:1000"],
+            [
+                {"user": "root", "uid": "0"},
+                {"user": "me", "uid": "1000"},
+            ],
+        ),
+    ],
+)
+def test_records(
+    delimiter: Optional[str],
+    fields: Optional[Sequence[str]],
+    lines: List[str],
+    records: List[Any],
+) -> None:
+    # Arrange
+    parser = DelimitedParser(delimiter=delimiter, fields=fields)
+
+    # Act
+    for line in lines:
+        parser.feed(line)
+
+    # Assert
+    assert parser.records == records
@@ -0,0 +1,55 @@
+import pickle
+from typing import Any, List
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from pyshell2.parsers import JsonLinesParser
+
+
+@pytest.mark.parametrize(
+    "lines, records",
+    [
+        ([], []),
+        (['{"a": 1}'], [{"a": 1}]),
+        (['{"a": 1}', "", "  ", "[1, 2]", "null"], [{"a": 1}, [1, 2], None]),
+    ],
+)
+def test_records(lines: List[str], records: List[Any]) -> None:
+    # Arrange
+    parser = JsonLinesParser()
+
+    # Act
+    for line in lines:
+        parser.feed(line)
+
+    # Assert
+    assert parser.records == records
+
+
+def test_callback() -> None:
+    # Arrange
+    callback = MagicMock()
+    parser = JsonLinesParser(callback=callback, retain_records=False)
+
+    # Act
+    parser.feed('{"a": 1}')
+    parser.feed('{"b": 2}')
+
+    # Assert
+    assert callback.call_args_list == [call({"a": 1}), call({"b": 2})]
+    assert parser.records == []
+
+
+def test_pickled_without_callback_and_records() -> None:
+    # Arrange
+    parser = JsonLinesParser(callback=MagicMock())
+    parser.feed('{"a": 1}')
+
+    # Act
+    copy = pickle.loads(pickle.dumps(parser))
+    copy.feed("[1, 2]")
+
+    # Assert
+    assert copy.callback is None
+    assert copy.records == [[1, 2]]
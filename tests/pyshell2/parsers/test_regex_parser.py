@@ -0,0 +1,25 @@
+from typing import Any, List
+
+import pytest
+
+from pyshell2.parsers import RegexParser
+
+
+@pytest.mark.parametrize(
+    "pattern, records",
+    [
+        (r"\d+%", ["10%", "100%"]),
+        (r"(\d+)%", [("10",), ("100",)]),
+        (r"(?P<progress>\d+)%", [{"progress": "10"}, {"progress": "100"}]),
+    ],
+)
+def test_records(pattern: str, records: List[Any]) -> None:
+    # Arrange
+    parser = RegexParser(pattern)
+
+    # Act
+    for line in ["Downloading: 10%", "Extracting", "Downloading: 100%"]:
+        parser.feed(line)
+
+    # Assert
+    assert parser.records == records
@@ -0,0 +1,81 @@
+import asyncio
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from pyshell2.asyncshell import sh, spawn
+from pyshell2.recording import record, replay
+
+CMD = ["sh", "-c", "printf 'a\\n'; sleep 0.2; printf 'b\\n' >&2; exit 3"]
+
+
+@pytest.fixture
+def recording(tmp_path: Path) -> Path:
+    path = tmp_path / "recording.jsonl.gz"
+    with record(path):
+        exitcode, stdout, stderr = asyncio.run(sh(CMD, check_exitcode=False))
+    assert (exitcode, stdout, stderr) == (3, "a", "b")
+    return path
+
+
+@pytest.fixture
+def no_subprocess(recording: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    # Depends on recording, so that commands are only replayed once recorded
+    async def fail(*args: Any, **kwargs: Any) -> None:
+        raise AssertionError("A subprocess was created")
+
+    monkeypatch.setattr(asyncio.subprocess, "create_subprocess_shell", fail)
+
+
+@pytest.mark.usefixtures("no_subprocess")
+@pytest.mark.parametrize("speed,min_duration", [(1.0, 0.2), (float("inf"), 0.0)])
+def test_replay(recording: Path, speed: float, min_duration: float) -> None:
+    # Act
+    with replay(recording, speed=speed):
+        start = time.monotonic()
+        result = asyncio.run(sh(CMD, check_exitcode=False))
+        duration = time.monotonic() - start
+
+    # Assert
+    assert result == (3, "a", "b")
+    assert min_duration <= duration < min_duration + 0.15
+
+
+@pytest.mark.usefixtures("no_subprocess")
+def test_replay_unrecorded(recording: Path) -> None:
+    with replay(recording):
+        with pytest.raises(LookupError):
+            asyncio.run(sh(["echo unrecorded"]))
+
+
+@pytest.mark.usefixtures("no_subprocess")
+@pytest.mark.asyncio
+async def test_replay_killed(recording: Path) -> None:
+    with replay(recording):
+        async with spawn(CMD) as process:
+            # Act
+            first = await process.read_until()
+
+        # Assert
+        assert first == "a\n"
+        assert process.returncode == -9
+
+
+@pytest.mark.asyncio
+async def test_record_not_waited_for(tmp_path: Path) -> None:
+    # Arrange
+    path = tmp_path / "recording.jsonl.gz"
+
+    # Act
+    with record(path):
+        async with spawn(["echo", "hi"]) as process:
+            await process.read_until()
+            await asyncio.sleep(0.2)  # Exits, without being waited for
+
+    # Assert
+    with replay(path, speed=float("inf")):
+        async with spawn(["echo", "hi"]) as process:
+            assert await process.read_until() == "hi\n"
+            assert await process.wait() == 0
@@ -0,0 +1,52 @@
+import pytest
+
+from pyshell2.core import ProcessInfo
+from pyshell2.results import CompactProcessInfo
+
+
+def test_process_info_compatible() -> None:
+    # Arrange
+    process_info = CompactProcessInfo(1, b"Hello World!", "ERROR")
+
+    # Act
+    exitcode, stdout, stderr = process_info
+
+    # Assert
+    assert (exitcode, stdout, stderr) == (1, "Hello World!", "ERROR")
+    assert process_info.exitcode == process_info[0] == 1
+    assert process_info.stdout == process_info[1] == "Hello World!"
+    assert process_info.stderr == process_info[2] == "ERROR"
+    assert process_info == ProcessInfo(1, "Hello World!", "ERROR")
+    assert process_info.to_process_info() == ProcessInfo(1, "Hello World!", "ERROR")
+
+
+def test_outputs_shared() -> None:
+    # Arrange
+    stdout = "".join(["Hello ", "World!"])  # Not interned by the compiler
+
+    # Act
+    process_infos = [
+        CompactProcessInfo.from_process_info(ProcessInfo(0, stdout, "")),
+        CompactProcessInfo.from_process_info(ProcessInfo(0, "Hello World!", "")),
+    ]
+
+    # Assert
+    assert process_infos[0].stdout is process_infos[1].stdout
+
+
+def test_slots() -> None:
+    # Act & Assert
+    assert not hasattr(CompactProcessInfo(0), "__dict__")
+
+
+def test_immutable() -> None:
+    # Arrange
+    process_info = CompactProcessInfo(1, "Hello World!", "ERROR")
+    process_infos = {process_info}
+
+    # Act & Assert
+    with pytest.raises(AttributeError):
+        process_info.exitcode = 0  # type: ignore[misc]
+    with pytest.raises(AttributeError):
+        process_info._stdout = ""
+    assert process_info in process_infos
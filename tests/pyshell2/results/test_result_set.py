@@ -0,0 +1,36 @@
+from typing import List, Union
+
+import pytest
+
+from pyshell2.core import ProcessInfo
+from pyshell2.results import CompactProcessInfo, ResultSet
+
+
+def test_results() -> None:
+    # Arrange
+    process_infos: List[Union[ProcessInfo, CompactProcessInfo]] = [
+        ProcessInfo(0, "Hello", ""),
+        ProcessInfo(1, "", "ERROR"),
+        ProcessInfo(0, "", ""),
+        CompactProcessInfo(2, "World!", "ERROR"),
+    ]
+
+    # Act
+    result_set = ResultSet(process_infos)
+
+    # Assert
+    assert len(result_set) == 4
+    assert list(result_set) == process_infos
+    assert result_set[-1] == process_infos[-1]
+    assert result_set.failed() == [1, 3]
+    assert result_set.buffer == b"HelloERRORWorld!ERROR"
+    assert result_set.exitcodes.tolist() == [0, 1, 0, 2]
+
+
+def test_index_error() -> None:
+    # Arrange
+    result_set = ResultSet([ProcessInfo(0, "", "")])
+
+    # Act & Assert
+    with pytest.raises(IndexError):
+        result_set[1]
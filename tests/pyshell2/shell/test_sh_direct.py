@@ -0,0 +1,68 @@
+import logging
+from subprocess import CalledProcessError, CompletedProcess
+from unittest.mock import MagicMock, call, patch
+
+import pytest
+
+from pyshell2.shell import ProcessInfo, sh_direct
+
+
+@patch("subprocess.run")
+def test_subprocess_run_called(subprocess_run: MagicMock) -> None:
+    # Arrange
+    subprocess_run.return_value = CompletedProcess([], 0, b"", b"")
+
+    # Act
+    sh_direct(["ls", "-a", "./folder with space in it"], cwd="/tmp")
+
+    # Assert
+    assert subprocess_run.call_args_list == [
+        call(
+            'ls -a "./folder with space in it"',
+            shell=True,
+            capture_output=True,
+            env=None,
+            cwd="/tmp",
+            close_fds=False,
+        )
+    ]
+
+
+@patch("logging.log", return_value=MagicMock(wraps=logging.log))
+@patch("subprocess.run")
+def test_output(subprocess_run: MagicMock, logging_log: MagicMock) -> None:
+    # Arrange
+    subprocess_run.return_value = CompletedProcess(
+        [], 0, b"file0\nfile1\n", b"file2: Permission Denied\n"
+    )
+
+    # Act
+    process_info = sh_direct(["ls"], stdout_log_level=-12, stderr_log_level=-13)
+
+    # Assert
+    assert process_info == ProcessInfo(0, "file0\nfile1", "file2: Permission Denied")
+    assert logging_log.mock_calls == [
+        call(-12, "file0"),
+        call(-12, "file1"),
+        call(-13, "file2: Permission Denied"),
+    ]
+
+
+@patch("subprocess.run")
+def test_check_exitcode_true(subprocess_run: MagicMock) -> None:
+    # Arrange
+    subprocess_run.return_value = CompletedProcess([], 1, b"", b"")
+
+    # Act & Assert
+    with pytest.raises(CalledProcessError):
+        sh_direct(["ls", "-a"], check_exitcode=True)
+
+
+def test_real_process() -> None:
+    # Act
+    process_info = sh_direct(
+        ["echo", "$GREETING"], env_overlay={"GREETING": "Hello World!"}
+    )
+
+    # Assert
+    assert process_info == ProcessInfo(0, "Hello World!", "")
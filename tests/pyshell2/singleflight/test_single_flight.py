@@ -0,0 +1,111 @@
+import asyncio
+from functools import partial
+from typing import List
+
+import pytest
+
+from pyshell2.singleflight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_collapsed() -> None:
+    # Arrange
+    group = SingleFlight()
+    runs: List[str] = []
+
+    async def run(key: str) -> str:
+        runs.append(key)
+        await asyncio.sleep(0.01)
+        return key
+
+    # Act
+    results = await asyncio.gather(
+        *(group.run(key, partial(run, key)) for key in ["a", "a", "b", "a"])
+    )
+    after = await group.run("a", partial(run, "a"))
+
+    # Assert
+    assert results == ["a", "a", "b", "a"]
+    assert after == "a"
+    assert runs == ["a", "b", "a"]
+    assert (group.calls, group.collapsed, group.in_flight) == (5, 2, 0)
+
+
+@pytest.mark.asyncio
+async def test_exception_shared() -> None:
+    # Arrange
+    group = SingleFlight()
+
+    async def fail() -> None:
+        await asyncio.sleep(0)
+        raise ValueError("failed")
+
+    # Act
+    results = await asyncio.gather(
+        group.run("a", fail), group.run("a", fail), return_exceptions=True
+    )
+
+    # Assert
+    assert [type(result) for result in results] == [ValueError, ValueError]
+    assert group.collapsed == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelled_with_last_caller() -> None:
+    # Arrange
+    group = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def run() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.ensure_future(group.run("a", run)) for _ in range(2)]
+    await asyncio.sleep(0)
+
+    # Act & Assert
+    callers[0].cancel()
+    await asyncio.sleep(0)
+    assert not cancelled.is_set()
+
+    callers[1].cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    assert cancelled.is_set()
+    assert group.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_new_flight_while_cancelled_call_tears_down() -> None:
+    # Arrange
+    group = SingleFlight()
+    runs: List[str] = []
+
+    async def run() -> str:
+        runs.append("run")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            await asyncio.sleep(0.1)  # E.g. killing and reaping the command
+            raise
+        return "a"
+
+    async def run_quickly() -> str:
+        runs.append("run_quickly")
+        return "b"
+
+    caller = asyncio.ensure_future(group.run("a", run))
+    await asyncio.sleep(0)
+    caller.cancel()
+    await asyncio.sleep(0.01)
+
+    # Act
+    result = await group.run("a", run_quickly)
+
+    # Assert
+    assert result == "b"
+    assert runs == ["run", "run_quickly"]
+    with pytest.raises(asyncio.CancelledError):
+        await caller
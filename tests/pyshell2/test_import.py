@@ -0,0 +1,48 @@
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+import pyshell2
+
+SRC = Path(pyshell2.__file__).parents[1]
+
+
+def imported_modules(module: str) -> Dict[str, int]:
+    """Returns the modules imported by importing module in a fresh interpreter, with
+    their cumulative import time in microseconds."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        check=True,
+        cwd=SRC,
+        text=True,
+    )
+    # Each line reads "import time: <self us> | <cumulative us> | <module>"
+    lines = [
+        line.split(":", 1)[1].split("|")
+        for line in process.stderr.splitlines()
+        if line.startswith("import time:")
+    ]
+    return {name.strip(): int(cumulative) for _, cumulative, name in lines[1:]}
+
+
+@pytest.mark.parametrize("module", ["pyshell2.shell", "pyshell2.docker"])
+def test_import_cheap(module: str) -> None:
+    # Act
+    modules = imported_modules(module)
+
+    # Assert
+    assert not modules.keys() & {"asyncio", "logging", "subprocess", "json", "pathlib"}
+    # Importing the module must take less time than importing asyncio alone
+    assert modules[module] < imported_modules("asyncio")["asyncio"]
+
+
+def test_lazy_submodules() -> None:
+    # Act & Assert
+    assert pyshell2.shell.sh.__module__ == "pyshell2.shell"
+    assert "shell" in dir(pyshell2)
+    with pytest.raises(AttributeError):
+        pyshell2.nonexistent